@@ -0,0 +1,146 @@
+import argparse
+import json
+
+import numpy as np
+
+import Maze
+import Solver
+
+
+def degrees(cells: np.ndarray, first: np.ndarray = None, second: np.ndarray = None) -> np.ndarray:
+    """
+    Number of open walls of every node
+
+    Args:
+        cells: uint8 array of N S E W wall bits
+        first: optional open edges from Maze.open_edges, found again when not given
+        second: the other ends of the open edges
+
+    Returns:
+        degree: flat array with the degree of every node, indexed by y * width + x
+    """
+    if first is None:
+        first, second = Maze.open_edges(cells)
+
+    return np.bincount(first, minlength=cells.size) + np.bincount(second, minlength=cells.size)
+
+
+def corridor_lengths(count: int, first: np.ndarray, second: np.ndarray, degree: np.ndarray) -> np.ndarray:
+    """
+    Length of every corridor, a run of nodes with two open walls between two nodes that don't have two
+
+    The degree 2 nodes are split into runs with a union find over the edges joining two of
+    them, a run of k nodes is a corridor of k + 1 steps from one end to the other. A run that
+    closes on itself is a loop of k steps, and an edge between two nodes that aren't degree 2
+    is a corridor of a single step.
+
+    Args:
+        count: number of nodes
+        first: one end of every open edge
+        second: the other end of every open edge
+        degree: degree of every node
+
+    Returns:
+        lengths: number of steps along every corridor
+    """
+    passing = degree == 2
+    inner = passing[first] & passing[second]
+
+    labels = Maze.connected_components(count, first[inner], second[inner])
+    runs = labels[passing]
+
+    # size of every run and how many edges it has inside of it, a loop has as many edges as nodes
+    sizes = np.bincount(runs, minlength=count)
+    edges = np.bincount(labels[first[inner]], minlength=count)
+    roots = np.unique(runs)
+    loops = edges[roots] == sizes[roots]
+
+    single = np.count_nonzero(~passing[first] & ~passing[second])
+
+    return np.concatenate([
+        np.where(loops, sizes[roots], sizes[roots] + 1),
+        np.ones(single, dtype=np.intp)
+    ])
+
+
+def analyze(maze: Maze.Maze) -> dict:
+    """
+    Checks a maze and describes how hard it is, with whole-array operations over its walls
+
+    Args:
+        maze: the maze to analyze
+
+    Returns:
+        report: a dict that can go straight to JSON with
+            nodes: number of nodes
+            open_walls: number of walls knocked down between two nodes
+            consistent: every wall agrees from both sides and the outer walls are up
+            components: number of groups of nodes that can reach each other
+            cycles: number of independent loops, open_walls - nodes + components
+            perfect: consistent, connected and without loops, see Maze.is_perfect
+            dead_ends: number of nodes with a single open wall
+            junctions: number of nodes with three or four open walls
+            degree_histogram: number of nodes with 0 to 4 open walls
+            corridors: count, mean, median and max of the corridor lengths in steps
+            corridor_histogram: number of corridors of every length from 0 steps up
+            solution_length: board squares from the start to the exit, None if unreachable
+            solution_nodes: nodes along the solution, None if unreachable
+    """
+    cells = maze.cells
+    count = cells.size
+
+    first, second = Maze.open_edges(cells)
+    degree = degrees(cells, first, second)
+
+    consistent = Maze.walls_consistent(cells)
+
+    labels = Maze.connected_components(count, first, second)
+    components = int(np.count_nonzero(labels == np.arange(count)))
+    cycles = len(first) - count + components
+
+    lengths = corridor_lengths(count, first, second, degree)
+
+    # a single search from the start, it's the path in a perfect maze and the shortest one otherwise,
+    # a malformed maze is searched on the board it draws rather than through its wall bits
+    sol = Solver.Maze_Solver(maze, mode='direct' if consistent else 'graph')
+    path = sol.BFS()
+    squares = len(sol.path_squares()) - 1 if path else None
+
+    return {
+        'nodes': count,
+        'open_walls': len(first),
+        'consistent': consistent,
+        'components': components,
+        'cycles': cycles,
+        'perfect': consistent and components == 1 and cycles == 0,
+        'dead_ends': int(np.count_nonzero(degree == 1)),
+        'junctions': int(np.count_nonzero(degree >= 3)),
+        'degree_histogram': np.bincount(degree, minlength=5).tolist(),
+        'corridors': {
+            'count': len(lengths),
+            'mean': float(lengths.mean()) if len(lengths) else 0.0,
+            'median': float(np.median(lengths)) if len(lengths) else 0.0,
+            'max': int(lengths.max()) if len(lengths) else 0
+        },
+        'corridor_histogram': np.bincount(lengths).tolist(),
+        'solution_length': squares,
+        'solution_nodes': squares // 2 if path else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a maze and print its analytics as JSON.")
+    parser.add_argument('--length', type=int, default=35)
+    parser.add_argument('--width', type=int, default=35)
+    parser.add_argument('--method', default='backtrack')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    m = Maze.Maze(length=args.length, width=args.width)
+    m.generate(args.method, seed=args.seed)
+
+    print(json.dumps(analyze(m), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+import Analytics
+import Maze
+import Solver
+
+
+SEARCHES = ('BFS', 'DFS', 'dijkstra', 'astar', 'bidirectional')
+
+
+def task_seeds(seed: int, count: int, chunksize: int = 1024):
+    """
+    A generator that derives an independent seed for every task from one batch seed
+
+    Seeds are spawned a chunk at a time, spawning from the same SeedSequence again carries
+    on where the last spawn stopped so the seeds don't depend on the chunk size.
+
+    Args:
+        seed: seed for the whole batch
+        count: number of tasks
+        chunksize: number of seeds spawned at once
+
+    Returns:
+        seeds: a list of integer seeds for every chunk of tasks, the same every time for the same batch seed
+    """
+    sequence = np.random.SeedSequence(seed)
+
+    for first in range(0, count, chunksize):
+        children = sequence.spawn(min(chunksize, count - first))
+        yield [int(child.generate_state(1)[0]) for child in children]
+
+
+def solve_one(index: int, seed: int, length: int, width: int, method: str, search: str, analyze: bool = False) -> dict:
+    """
+    Generates and solves a single maze
+
+    Args:
+        index: position of the task in the batch
+        seed: seed for generating the maze
+        length: the number of nodes long
+        width: the number of nodes wide
+        method: generation method passed to Maze.generate
+        search: name of the Maze_Solver search to run
+        analyze: also add the maze's Analytics.analyze report under 'analytics'
+
+    Returns:
+        result: seed, size, path length and timings of each stage
+    """
+    start = time.perf_counter()
+    m = Maze.Maze(length=length, width=width)
+    m.generate(method, seed=seed)
+    generated = time.perf_counter()
+
+    # graph mode so graph_seconds is the graph build and every search is timed on the same graph
+    sol = Solver.Maze_Solver(m, mode='graph')
+    built = time.perf_counter()
+
+    path = getattr(sol, search)()
+    if isinstance(path, tuple):
+        path = path[0]
+    solved = time.perf_counter()
+
+    # every step along the path is a straight corridor
+    path_length = sum(abs(b[0] - a[0]) + abs(b[1] - a[1]) for a, b in zip(path, path[1:]))
+
+    result = {
+        'index': index,
+        'seed': seed,
+        'length': length,
+        'width': width,
+        'method': method,
+        'search': search,
+        'path_length': path_length,
+        'path_vertices': len(path),
+        'expanded': sol.expanded,
+        'generate_seconds': generated - start,
+        'graph_seconds': built - generated,
+        'solve_seconds': solved - built
+    }
+
+    if analyze:
+        result['analytics'] = Analytics.analyze(m)
+
+    return result
+
+
+def solve_chunk(tasks: list) -> list:
+    """Runs a chunk of tasks in a worker, sending only small tuples in and small dicts back."""
+    return [solve_one(*task) for task in tasks]
+
+
+def run_batch(count: int, length: int, width: int, method: str = 'backtrack', search: str = 'dijkstra',
+              seed: int = 0, workers: int = None, chunksize: int = 8, analyze: bool = False):
+    """
+    A generator that fans maze generation and solving out over a pool of processes.
+
+    Tasks are sent out in chunks and only a couple of chunks per worker are in flight at a
+    time, so memory stays flat however many mazes are in the batch. Results are yielded as
+    soon as their chunk finishes, so they don't come back in index order.
+
+    Args:
+        count: number of mazes to generate and solve
+        length: the number of nodes long
+        width: the number of nodes wide
+        method: generation method passed to Maze.generate
+        search: Maze_Solver search to run, one of SEARCHES
+        seed: seed for the whole batch, every task gets its own seed derived from it
+        workers: number of processes, defaults to the number of cores
+        chunksize: number of tasks sent to a worker at once
+        analyze: add every maze's Analytics.analyze report to its result
+
+    Returns:
+        result: a result dict for every maze
+    """
+    if search not in SEARCHES:
+        raise ValueError(f"Unknown search '{search}', expected one of {list(SEARCHES)}")
+
+    workers = workers or os.cpu_count()
+
+    # chunks are only made as they're sent out, nothing is built for the whole batch up front
+    chunks = ([(first + i, task_seed, length, width, method, search, analyze) for i, task_seed in enumerate(seeds)]
+              for first, seeds in zip(range(0, count, chunksize), task_seeds(seed, count, chunksize)))
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+
+        while True:
+            # keep every worker busy with one chunk queued up behind it
+            for chunk in chunks:
+                pending.add(executor.submit(solve_chunk, chunk))
+                if len(pending) >= workers * 2:
+                    break
+
+            if not pending:
+                break
+
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from future.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate and solve a batch of mazes across several processes.")
+    parser.add_argument('--count', type=int, default=1000)
+    parser.add_argument('--length', type=int, default=35)
+    parser.add_argument('--width', type=int, default=35)
+    parser.add_argument('--method', default='backtrack')
+    parser.add_argument('--search', default='dijkstra', choices=SEARCHES)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunksize', type=int, default=8)
+    parser.add_argument('--output', default='results.jsonl')
+    parser.add_argument('--analyze', action='store_true', help="add the analytics of every maze to its result")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with open(args.output, 'w') as fh:
+        for result in run_batch(args.count, args.length, args.width, args.method, args.search,
+                                args.seed, args.workers, args.chunksize, args.analyze):
+            fh.write(json.dumps(result) + '\n')
+
+    seconds = time.perf_counter() - start
+    print(f"Solved {args.count} mazes in {seconds:.2f}s ({args.count / seconds:.1f} mazes/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,293 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import Maze
+import Solver
+
+
+DEFAULT_SIZES = [32, 64, 128, 256, 512, 1024, 2048, 4096]
+
+# largest size a stage runs at by default, Aldous-Broder's random walk takes minutes past this
+STAGE_LIMITS = {'Aldous_Broder': 256}
+
+
+# every stage is set up from the size's maze outside of the measurement and returns a function
+# to measure, which returns how many vertices it expanded or None if it doesn't search
+
+def _iterative_backtrack(maze, seed, workdir):
+    m = Maze.Maze(length=maze.length, width=maze.width)
+    return lambda: m.iterative_backtrack(seed=seed)
+
+
+def _aldous_broder(maze, seed, workdir):
+    m = Maze.Maze(length=maze.length, width=maze.width)
+    return lambda: m.Aldous_Broder(seed=seed)
+
+
+def _convert_to_image(maze, seed, workdir):
+    def run():
+        maze.convert_to_image(save=False)
+
+    return run
+
+
+def _read_picture(maze, seed, workdir):
+    name = os.path.join(workdir, 'maze.png')
+    if not os.path.exists(name):
+        maze.convert_to_image(save=False).save(name)
+
+    m = Maze.Maze(length=maze.length, width=maze.width)
+    return lambda: m.read_picture(name)
+
+
+def _create_graph(maze, seed, workdir):
+    sol = Solver.Maze_Solver(maze, mode='direct')
+    return sol._create_graph
+
+
+def _graph_search(search):
+    def setup(maze, seed, workdir):
+        sol = Solver.Maze_Solver(maze, mode='graph')
+        sol._adjacency()
+
+        def run():
+            getattr(sol, search)()
+            return sol.expanded
+
+        return run
+
+    return setup
+
+
+def _direct_search(search):
+    def setup(maze, seed, workdir):
+        sol = Solver.Maze_Solver(maze, mode='direct')
+
+        def run():
+            getattr(sol, search)()
+            return sol.expanded
+
+        return run
+
+    return setup
+
+
+STAGES = {
+    'iterative_backtrack': _iterative_backtrack,
+    'Aldous_Broder': _aldous_broder,
+    'convert_to_image': _convert_to_image,
+    'read_picture': _read_picture,
+    '_create_graph': _create_graph,
+    'BFS': _graph_search('BFS'),
+    'DFS': _graph_search('DFS'),
+    'dijkstra': _graph_search('dijkstra'),
+    'direct_BFS': _direct_search('BFS'),
+    'direct_astar': _direct_search('astar')
+}
+
+
+def measure(setup, maze: Maze.Maze, seed: int, workdir: str, repeat: int = 5, memory: bool = True) -> dict:
+    """
+    Measures a single stage on a single maze
+
+    The wall time is the best of the repeats, run without tracemalloc since tracing slows
+    every allocation down, and the spread is how much slower the median repeat was. The peak memory comes from one more traced run and only counts
+    what the stage allocates, not what its setup did.
+
+    Args:
+        setup: function of (maze, seed, workdir) that returns the function to measure
+        maze: the generated maze for this size
+        seed: seed the maze was generated with
+        workdir: directory for any files the stage needs
+        repeat: how many timed runs to take the best of
+        memory: also measure the peak memory
+
+    Returns:
+        result: seconds, spread, peak_bytes (None when not measured) and expanded (None if the stage doesn't search)
+    """
+    seconds = []
+    for _ in range(repeat):
+        run = setup(maze, seed, workdir)
+        gc.collect()
+
+        start = time.perf_counter()
+        expanded = run()
+        seconds.append(time.perf_counter() - start)
+
+    peak = None
+    if memory:
+        run = setup(maze, seed, workdir)
+        gc.collect()
+
+        tracemalloc.start()
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    seconds.sort()
+    spread = seconds[len(seconds) // 2] / seconds[0] - 1 if seconds[0] else 0.0
+
+    return {'seconds': seconds[0], 'spread': spread, 'peak_bytes': peak, 'expanded': expanded}
+
+
+def run_suite(sizes: list = None, stages: list = None, seed: int = 0, repeat: int = 5, memory: bool = True,
+              limits: bool = True, log=None) -> dict:
+    """
+    Runs every stage over every size on mazes generated with a fixed seed
+
+    Args:
+        sizes: number of nodes long and wide of each maze, defaults to DEFAULT_SIZES
+        stages: names of the stages to run, defaults to all of STAGES
+        seed: seed for generating the mazes, the same seed always benchmarks the same mazes
+        repeat: how many timed runs to take the best of
+        memory: also measure the peak memory of every stage
+        limits: skip stages above their size in STAGE_LIMITS
+        log: optional function called with every result as it comes in
+
+    Returns:
+        run: the settings and environment of the run and a list of results
+    """
+    sizes = sizes or DEFAULT_SIZES
+    stages = stages or list(STAGES)
+
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        raise ValueError(f"Unknown stages {unknown}, expected some of {list(STAGES)}")
+
+    results = []
+    for size in sizes:
+        maze = Maze.Maze(length=size, width=size)
+        maze.generate('backtrack', seed=seed)
+
+        with tempfile.TemporaryDirectory() as workdir:
+            for stage in stages:
+                if limits and size > STAGE_LIMITS.get(stage, size):
+                    continue
+
+                result = {'stage': stage, 'size': size}
+                result.update(measure(STAGES[stage], maze, seed, workdir, repeat, memory))
+                results.append(result)
+
+                if log:
+                    log(result)
+
+    return {
+        'seed': seed,
+        'repeat': repeat,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'results': results
+    }
+
+
+def compare(base: dict, new: dict, threshold: float = 0.1, min_seconds: float = 0.05, min_delta: float = 0.01) -> list:
+    """
+    Compares two runs stage by stage and size by size
+
+    A time only regresses when it grew by more than both min_delta and the threshold plus
+    the larger spread of the two runs, so the jitter of short stages and noisy machines
+    doesn't fail the comparison.
+
+    Args:
+        base: the run to compare against, as returned by run_suite
+        new: the run being checked
+        threshold: fraction a time or peak memory can grow by before it's a regression
+        min_seconds: times this short in both runs are too noisy to compare
+        min_delta: seconds a time has to grow by on top of the threshold to be a regression
+
+    Returns:
+        rows: one dict per stage and size found in both runs with the ratio of new to
+              base for every metric and whether it regressed
+    """
+    baseline = {(result['stage'], result['size']): result for result in base['results']}
+    rows = []
+
+    for result in new['results']:
+        old = baseline.get((result['stage'], result['size']))
+        if old is None:
+            continue
+
+        row = {'stage': result['stage'], 'size': result['size'], 'regressed': []}
+        for metric in ('seconds', 'peak_bytes', 'expanded'):
+            if not old.get(metric) or result.get(metric) is None:
+                row[metric] = None
+                continue
+
+            row[metric] = result[metric] / old[metric]
+            noisy = metric == 'seconds' and (max(old[metric], result[metric]) < min_seconds
+                                             or result[metric] - old[metric] < min_delta)
+
+            # results saved before the spread was measured count as exact
+            allowed = threshold
+            if metric == 'seconds':
+                allowed += max(old.get('spread', 0.0), result.get('spread', 0.0))
+
+            if row[metric] > 1 + allowed and not noisy:
+                row['regressed'].append(metric)
+
+        rows.append(row)
+
+    return rows
+
+
+def _print_result(result: dict):
+    peak = '-' if result['peak_bytes'] is None else f"{result['peak_bytes'] / 2 ** 20:.1f}"
+    expanded = '-' if result['expanded'] is None else result['expanded']
+    print(f"{result['stage']:>20} {result['size']:>6} {result['seconds']:>9.4f} {peak:>9} {expanded:>10}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark maze generation, rendering, ingestion and solving over a range of sizes.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--stages', nargs='+', default=list(STAGES), choices=list(STAGES))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--no-memory', action='store_true', help="skip the traced run for peak memory")
+    parser.add_argument('--no-limits', action='store_true', help="run every stage at every size, see STAGE_LIMITS")
+    parser.add_argument('--output', default=None, help="write the results to this JSON file")
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'), help="compare two result files instead of running")
+    parser.add_argument('--threshold', type=float, default=0.1)
+    parser.add_argument('--min-seconds', type=float, default=0.05, help="times shorter than this in both runs aren't compared")
+    parser.add_argument('--min-delta', type=float, default=0.01, help="seconds a time has to grow by to be a regression")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as fh:
+            base = json.load(fh)
+        with open(args.compare[1]) as fh:
+            new = json.load(fh)
+
+        rows = compare(base, new, args.threshold, args.min_seconds, args.min_delta)
+
+        print(f"{'stage':>20} {'size':>6} {'seconds':>9} {'peak':>9} {'expanded':>10}")
+        for row in rows:
+            ratios = [' ' * 9 if row[m] is None else f"{row[m]:>8.2f}x" for m in ('seconds', 'peak_bytes')]
+            expanded = ' ' * 10 if row['expanded'] is None else f"{row['expanded']:>9.2f}x"
+            flag = '  REGRESSED ' + ', '.join(row['regressed']) if row['regressed'] else ''
+            print(f"{row['stage']:>20} {row['size']:>6} {ratios[0]} {ratios[1]} {expanded}{flag}")
+
+        regressions = sum(1 for row in rows if row['regressed'])
+        print(f"{regressions} regressions past {args.threshold:.0%}")
+        sys.exit(1 if regressions else 0)
+
+    print(f"{'stage':>20} {'size':>6} {'seconds':>9} {'peak MiB':>9} {'expanded':>10}")
+    run = run_suite(args.sizes, args.stages, args.seed, args.repeat, not args.no_memory,
+                    not args.no_limits, _print_result)
+
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump(run, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
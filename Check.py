@@ -0,0 +1,486 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+from collections import deque
+
+import numpy as np
+
+import Maze
+import Parallel
+import Query
+import Solver
+import Tiled
+
+
+def board_distances(board: np.ndarray, source) -> np.ndarray:
+    """
+    Distance from one board square to every other with a plain breadth first search over the board
+
+    Args:
+        board: boolean array that is True for open squares
+        source: [x, y] square to start from
+
+    Returns:
+        distance: array shaped like the board, -1 where a square can't be reached
+    """
+    rows, cols = board.shape
+    open_squares = board.tolist()
+    distance = [[-1] * cols for _ in range(rows)]
+    distance[source[1]][source[0]] = 0
+    queue = deque([(int(source[0]), int(source[1]))])
+
+    while queue:
+        x, y = queue.popleft()
+        for dx, dy in Maze.DIRECTIONS:
+            next_x, next_y = x + dx, y + dy
+
+            if 0 <= next_x < cols and 0 <= next_y < rows and open_squares[next_y][next_x] and distance[next_y][next_x] < 0:
+                distance[next_y][next_x] = distance[y][x] + 1
+                queue.append((next_x, next_y))
+
+    return np.array(distance, dtype=np.int64)
+
+
+def walk_error(board: np.ndarray, path: list, first, last, length: int) -> str:
+    """
+    Checks a path is a walk of length squares from first to last that only turns at its positions
+
+    Args:
+        board: boolean array that is True for open squares
+        path: [x, y] positions, or anything indexable like Solver.Node
+        first: [x, y] square the path has to start at
+        last: [x, y] square the path has to end at
+        length: number of squares the path has to walk
+
+    Returns:
+        error: what's wrong with the path, None if nothing is
+    """
+    positions = [(int(pos[0]), int(pos[1])) for pos in path]
+    if positions[0] != tuple(first) or positions[-1] != tuple(last):
+        return f"the path goes from {list(positions[0])} to {list(positions[-1])} instead of {list(first)} to {list(last)}"
+
+    total = 0
+    for (x0, y0), (x1, y1) in zip(positions, positions[1:]):
+        if x0 != x1 and y0 != y1:
+            return f"[{x0}, {y0}] to [{x1}, {y1}] isn't a straight corridor"
+
+        if not board[min(y0, y1):max(y0, y1) + 1, min(x0, x1):max(x0, x1) + 1].all():
+            return f"[{x0}, {y0}] to [{x1}, {y1}] goes through a wall"
+
+        total += abs(x1 - x0) + abs(y1 - y0)
+
+    if total != length:
+        return f"the path walks {total} squares instead of {length}"
+
+    return None
+
+
+def _graph_of(solver: Solver.Maze_Solver) -> dict:
+    """Neighbors of every vertex as the incremental solver sees them, keyed by flat board index."""
+    rows, cols = solver.board.shape
+
+    return {y * cols + x: sorted(solver._neighbors_at(y * cols + x))
+            for y in range(rows) for x in range(cols) if solver._is_vertex(x, y)}
+
+
+def _fresh_graph(maze: Maze.Maze) -> dict:
+    """Neighbors of every vertex of a graph built from scratch, keyed by flat board index."""
+    solver = Solver.Maze_Solver(maze, mode='graph')
+    indptr, indices, weights, _ = solver._adjacency()
+    flat = solver._flat_vertices.tolist()
+
+    return {flat[v]: sorted((flat[indices[i]], weights[i]) for i in range(indptr[v], indptr[v + 1]))
+            for v in range(len(flat))}
+
+
+def check_repair(seed: int = 0, trials: int = 6, edits: int = 150) -> list:
+    """
+    Toggles random walls under an incremental Maze_Solver and checks every repair against a fresh solve
+
+    After every edit the patched board has to match a freshly drawn one and the repaired
+    path has to be a shortest walk from the start to the exit, found with board_distances.
+    Every tenth edit the patched graph is also compared with one built from scratch.
+
+    Args:
+        seed: seed for the mazes and the edits
+        trials: number of mazes
+        edits: walls toggled in every maze
+
+    Returns:
+        failures: a message for every check that failed, empty when everything agrees
+    """
+    rng = random.Random(seed)
+    failures = []
+
+    for trial in range(trials):
+        length, width = rng.randint(3, 14), rng.randint(3, 14)
+        m = Maze.Maze(length=length, width=width)
+        m.generate('backtrack', seed=rng.getrandbits(32))
+        sol = Solver.Maze_Solver(m, incremental=True)
+
+        for edit in range(edits):
+            x, y, wall = rng.randrange(width), rng.randrange(length), rng.randrange(4)
+            m.change_wall(x, y, wall)
+            where = f"repair: {length}x{width} maze {trial}, edit {edit} toggling wall {wall} of ({x}, {y})"
+
+            board = Solver.Maze_Solver(m, mode='direct').board
+            if not (sol.board == board).all():
+                failures.append(f"{where}: the patched board differs from a fresh one")
+                break
+
+            if edit % 10 == 0 and _graph_of(sol) != _fresh_graph(m):
+                failures.append(f"{where}: the patched graph differs from a fresh one")
+                break
+
+            path, found = sol.repair()
+            expected = int(board_distances(board, sol.start_pos)[sol.exit_pos[1], sol.exit_pos[0]])
+            expected = expected if expected >= 0 else None
+
+            if found != expected:
+                failures.append(f"{where}: repaired a path of {found} squares, the shortest is {expected}")
+                break
+
+            error = found is not None and walk_error(board, path, sol.start_pos, sol.exit_pos, found)
+            if error:
+                failures.append(f"{where}: {error}")
+                break
+
+        sol.close()
+
+    return failures
+
+
+def check_queries(seed: int = 0, trials: int = 6, sources: int = 5) -> list:
+    """
+    Checks Query_Engine distances, paths and lowest common ancestors on random perfect mazes
+
+    Distances from a few random squares to every open square are compared with
+    board_distances, a path to a random square has to be a walk of that distance, and the
+    lowest common ancestor of random vertex pairs is compared with climbing their parents.
+    A maze with a loop knocked into it has to be refused.
+
+    Args:
+        seed: seed for the mazes and the queries
+        trials: number of mazes
+        sources: squares to query from in every maze
+
+    Returns:
+        failures: a message for every check that failed, empty when everything agrees
+    """
+    rng = random.Random(seed)
+    failures = []
+
+    for trial in range(trials):
+        length, width = rng.randint(2, 16), rng.randint(2, 16)
+        method = rng.choice(['backtrack', 'wilson', 'eller'])
+        m = Maze.Maze(length=length, width=width)
+        m.generate(method, seed=rng.getrandbits(32))
+        where = f"queries: {length}x{width} {method} maze {trial}"
+
+        engine = Query.Query_Engine(Solver.Maze_Solver(m, mode='graph'))
+        board = engine.board
+        squares = np.argwhere(board)[:, ::-1]
+
+        for _ in range(sources):
+            source = squares[rng.randrange(len(squares))]
+            expected = board_distances(board, source)[squares[:, 1], squares[:, 0]]
+            found = engine.distance(np.broadcast_to(source, squares.shape), squares)
+
+            wrong = np.flatnonzero(found != expected)
+            if len(wrong):
+                target = squares[wrong[0]]
+                failures.append(f"{where}: distance from {source.tolist()} to {target.tolist()} is "
+                                f"{found[wrong[0]]}, a search over the board says {expected[wrong[0]]}")
+                break
+
+            pick = rng.randrange(len(squares))
+            error = walk_error(board, engine.path(source, squares[pick]), source, squares[pick], expected[pick])
+            if error:
+                failures.append(f"{where}: path from {source.tolist()} to {squares[pick].tolist()}: {error}")
+                break
+
+        # the lowest common ancestor is the first of one vertex's ancestors that's also one of the other's
+        parents = engine.parents.tolist()
+        for _ in range(20):
+            first, second = rng.randrange(len(parents)), rng.randrange(len(parents))
+
+            ancestors, vertex = set(), first
+            while vertex >= 0:
+                ancestors.add(vertex)
+                vertex = parents[vertex]
+
+            expected = second
+            while expected not in ancestors:
+                expected = parents[expected]
+
+            found = engine.lca(first, second)
+            if found != expected:
+                failures.append(f"{where}: lowest common ancestor of vertices {first} and {second} is {found}, "
+                                f"climbing their parents says {expected}")
+                break
+
+        # knocking down any wall still up between two nodes of a perfect maze makes a loop
+        closed = [(x, y, wall) for y in range(length) for x in range(width)
+                  for wall, (dx, dy) in enumerate(Maze.DIRECTIONS)
+                  if 0 <= x + dx < width and 0 <= y + dy < length and m.cells[y, x] & Maze.WALL_BITS[wall]]
+
+        if closed:
+            m.change_wall(*rng.choice(closed))
+            try:
+                Query.Query_Engine(Solver.Maze_Solver(m, mode='graph'))
+                failures.append(f"{where}: the maze with a loop knocked into it wasn't refused")
+            except ValueError:
+                pass
+
+    return failures
+
+
+def node_components(cells: np.ndarray) -> np.ndarray:
+    """
+    Labels every node with the smallest flat index it can reach, with a breadth first search from every unlabeled node
+
+    Args:
+        cells: uint8 array of N S E W wall bits
+
+    Returns:
+        labels: flat array with the label of every node, indexed by y * width + x
+    """
+    length, width = cells.shape
+    walls = cells.reshape(-1).tolist()
+    labels = [-1] * len(walls)
+
+    for root in range(len(walls)):
+        if labels[root] >= 0:
+            continue
+
+        labels[root] = root
+        queue = deque([root])
+        while queue:
+            current = queue.popleft()
+            y, x = divmod(current, width)
+
+            for wall, (dx, dy) in enumerate(Maze.DIRECTIONS):
+                next_x, next_y = x + dx, y + dy
+                if walls[current] & Maze.WALL_BITS[wall] or not (0 <= next_x < width and 0 <= next_y < length):
+                    continue
+
+                next_node = next_y * width + next_x
+                if labels[next_node] < 0:
+                    labels[next_node] = root
+                    queue.append(next_node)
+
+    return np.array(labels, dtype=np.intp)
+
+
+def brute_consistent(cells: np.ndarray) -> bool:
+    """Maze.walls_consistent one wall at a time: both sides of every wall agree and the outer walls are up."""
+    length, width = cells.shape
+
+    for y in range(length):
+        for x in range(width):
+            for wall, (dx, dy) in enumerate(Maze.DIRECTIONS):
+                up = bool(cells[y, x] & Maze.WALL_BITS[wall])
+                next_x, next_y = x + dx, y + dy
+
+                if not (0 <= next_x < width and 0 <= next_y < length):
+                    if not up:
+                        return False
+                elif up != bool(cells[next_y, next_x] & Maze.WALL_BITS[wall ^ 1]):
+                    return False
+
+    return True
+
+
+def brute_perfect(cells: np.ndarray) -> bool:
+    """Maze.is_perfect one node at a time: consistent walls, one component and a node more than open walls."""
+    if not brute_consistent(cells):
+        return False
+
+    # every open wall is counted from both of its sides
+    open_walls = sum(4 - bin(int(walls)).count('1') for walls in cells.reshape(-1)) // 2
+
+    return open_walls == cells.size - 1 and (node_components(cells) == 0).all()
+
+
+def check_perfect(seed: int = 0, trials: int = 6, edits: int = 20) -> list:
+    """
+    Checks Maze.is_perfect, walls_consistent, connected_components and parallel generation against brute force
+
+    Mazes from every generator are checked as they are, after random wall toggles that
+    add loops or cut parts off, and after flipping single wall bits so the two sides of a
+    wall disagree. Components are only compared while the walls agree. The mazes parallel_generate builds with two workers have to be perfect
+    and the same as the ones Tiled_Maze writes for the same arguments.
+
+    Args:
+        seed: seed for the mazes and the edits
+        trials: number of mazes from every generator
+        edits: walls toggled in every maze
+
+    Returns:
+        failures: a message for every check that failed, empty when everything agrees
+    """
+    rng = random.Random(seed)
+    failures = []
+
+    for method in ('backtrack', 'aldous_broder', 'wilson', 'eller'):
+        for trial in range(trials):
+            length, width = rng.randint(1, 12), rng.randint(1, 12)
+            m = Maze.Maze(length=length, width=width)
+            m.generate(method, seed=rng.getrandbits(32))
+
+            for edit in range(edits + 1):
+                where = f"perfect: {length}x{width} {method} maze {trial} after {edit} edits"
+
+                # which nodes are joined is only clear when both sides of every wall agree
+                first, second = Maze.open_edges(m.cells)
+                labels = Maze.connected_components(m.cells.size, first, second)
+                if brute_consistent(m.cells) and not (labels == node_components(m.cells)).all():
+                    failures.append(f"{where}: connected_components differs from a search from every node")
+                    break
+
+                if Maze.walls_consistent(m.cells) != brute_consistent(m.cells):
+                    failures.append(f"{where}: walls_consistent says {not brute_consistent(m.cells)}, "
+                                    f"checking wall by wall says {brute_consistent(m.cells)}")
+                    break
+
+                if m.is_perfect() != brute_perfect(m.cells):
+                    failures.append(f"{where}: is_perfect says {m.is_perfect()}, checking wall by wall says {not m.is_perfect()}")
+                    break
+
+                x, y, wall = rng.randrange(width), rng.randrange(length), rng.randrange(4)
+                if rng.random() < 0.2:
+                    m.cells[y, x] ^= Maze.WALL_BITS[wall]
+                else:
+                    m.change_wall(x, y, wall)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for trial in range(max(1, trials // 3)):
+            length, width, tile = rng.randint(1, 40), rng.randint(1, 40), rng.choice([4, 8, 12])
+            maze_seed = rng.getrandbits(32)
+            where = f"perfect: {length}x{width} maze in tiles of {tile} with seed {maze_seed}"
+
+            m = Parallel.parallel_generate(length, width, tile, seed=maze_seed, workers=2)
+            if not m.is_perfect():
+                failures.append(f"{where}: parallel_generate made a maze that isn't perfect")
+
+            name = os.path.join(workdir, 'tiled.bin')
+            Tiled.Tiled_Maze(length, width, tile, seed=maze_seed).generate(name)
+            tiled = Maze.Maze()
+            tiled.load_binary(name)
+
+            if not (tiled.cells == m.cells).all():
+                failures.append(f"{where}: parallel_generate and Tiled_Maze made different mazes")
+
+    return failures
+
+
+# outer walls opened with change_wall, which once sent the direct searches through the edge of the wall array
+EDGE_CASES = [
+    ((2, 2), [(0, 0, 2), (0, 1, 2), (1, 0, 2)]),
+    ((2, 2), [(0, 0, 1), (0, 1, 2), (0, 1, 1)])
+]
+
+
+def check_modes(seed: int = 0, trials: int = 6, edits: int = 30) -> list:
+    """
+    Checks the direct searches against graph mode on mazes with loops, openings in the outer wall and one sided walls
+
+    Both modes have to agree on whether the exit can be reached and on the length of
+    the shortest path, and every direct path has to be a shortest walk along the board
+    graph mode searches. The paths themselves can differ when there are ties.
+
+    Args:
+        seed: seed for the mazes and the edits
+        trials: number of random mazes, on top of EDGE_CASES
+        edits: walls toggled in every random maze
+
+    Returns:
+        failures: a message for every check that failed, empty when everything agrees
+    """
+    rng = random.Random(seed)
+    failures = []
+    mazes = []
+
+    for (length, width), walls in EDGE_CASES:
+        m = Maze.Maze(length=length, width=width)
+        for x, y, wall in walls:
+            m.change_wall(x, y, wall)
+        mazes.append((m, f"modes: {length}x{width} maze after toggling {walls}"))
+
+    for trial in range(trials):
+        length, width = rng.randint(1, 12), rng.randint(1, 12)
+        m = Maze.Maze(length=length, width=width)
+        m.generate('backtrack', seed=rng.getrandbits(32))
+
+        # any wall, outer ones included, and now and then only one side of it
+        for _ in range(edits):
+            x, y, wall = rng.randrange(width), rng.randrange(length), rng.randrange(4)
+            if rng.random() < 0.2:
+                m.cells[y, x] ^= Maze.WALL_BITS[wall]
+            else:
+                m.change_wall(x, y, wall)
+
+        mazes.append((m, f"modes: {length}x{width} maze {trial} after {edits} random edits"))
+
+    for m, where in mazes:
+        graph = Solver.Maze_Solver(m, mode='graph')
+        board = graph.board
+        expected = int(board_distances(board, graph.start_pos)[graph.exit_pos[1], graph.exit_pos[0]])
+        expected = expected if expected >= 0 else None
+
+        for search in ('BFS', 'dijkstra', 'astar'):
+            direct = Solver.Maze_Solver(m, mode='direct')
+            try:
+                getattr(direct, search)()
+            except IndexError as e:
+                failures.append(f"{where}: direct {search} failed with IndexError: {e}")
+                continue
+
+            found = None
+            if direct.path:
+                ends = zip(direct.path, direct.path[1:])
+                found = sum(abs(b[0] - a[0]) + abs(b[1] - a[1]) for a, b in ends)
+
+            if found != expected:
+                failures.append(f"{where}: direct {search} walked {found} squares, graph mode's board says {expected}")
+                continue
+
+            error = found is not None and walk_error(board, direct.path, graph.start_pos, graph.exit_pos, found)
+            if error:
+                failures.append(f"{where}: direct {search}: {error}")
+
+    return failures
+
+
+# every check takes a seed and a number of trials and returns a list of failures
+CHECKS = {
+    'repair': check_repair,
+    'queries': check_queries,
+    'perfect': check_perfect,
+    'modes': check_modes
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the solver's less obvious algorithms against brute force on small random mazes.")
+    parser.add_argument('--checks', nargs='+', default=list(CHECKS), choices=list(CHECKS))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--trials', type=int, default=6)
+    args = parser.parse_args()
+
+    failed = 0
+    for name in args.checks:
+        failures = CHECKS[name](seed=args.seed, trials=args.trials)
+        failed += len(failures)
+
+        print(f"{name:>8} {'ok' if not failures else f'{len(failures)} failed'}", flush=True)
+        for failure in failures:
+            print(f"         {failure}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
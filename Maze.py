@@ -1,27 +1,150 @@
 import random
+import struct
+import zlib
 import numpy as np
-from PIL import Image, ImageDraw
+from PIL import Image
+
+from Profiler import timed
+
+
+# wall bits for a node, in the same N S E W order as Node.walls
+NORTH, SOUTH, EAST, WEST = 1, 2, 4, 8
+WALL_BITS = (NORTH, SOUTH, EAST, WEST)
+ALL_WALLS = NORTH | SOUTH | EAST | WEST
+
+# change in position for moving through each wall, in N S E W order
+DIRECTIONS = ((0, -1), (0, 1), (1, 0), (-1, 0))
+
+# binary maze files: magic, version, flags, length, width, seed and algorithm name, see pack_seed for the flags
+BINARY_MAGIC = b'PFMZ'
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct('<4sHHIIq16s')
+
+
+def _random(seed: int = None):
+    """Gets a random number generator, the shared one from the random module when there is no seed."""
+    if seed is None:
+        return random
+
+    return random.Random(seed)
+
+
+class Walls(object):
+    """A list-like view of a single node's walls inside a packed wall array.
+
+    Args:
+        cells: uint8 array of N S E W wall bits
+        x: x position of the node in the array
+        y: y position of the node in the array
+    """
+
+    __slots__ = ('cells', 'x', 'y')
+
+    def __init__(self, cells: np.ndarray, x: int, y: int):
+        self.cells = cells
+        self.x = x
+        self.y = y
+
+    def clear(self):
+        """
+        Puts all four walls back up
+        """
+        self.cells[self.y, self.x] = ALL_WALLS
+
+    def __getitem__(self, index: int) -> int:
+        # indexing WALL_BITS raises IndexError past the fourth wall like a list would
+        return int(bool(self.cells[self.y, self.x] & WALL_BITS[index]))
+
+    def __setitem__(self, index: int, value: int):
+        if value:
+            self.cells[self.y, self.x] |= WALL_BITS[index]
+        else:
+            self.cells[self.y, self.x] &= ALL_WALLS ^ WALL_BITS[index]
+
+    def __len__(self):
+        return len(WALL_BITS)
+
+    def __iter__(self):
+        bits = int(self.cells[self.y, self.x])
+        return iter([(bits >> i) & 1 for i in range(len(WALL_BITS))])
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return str(list(self))
+
+    def __str__(self):
+        return str(list(self))
 
 
 class Node(object):
-    def __init__(self, x: int, y: int):
+    """A node of the maze at (x, y) with a view of its walls.
+
+    Slotted since grid hands out a new Node every time it's indexed. Nodes hash and
+    compare by their position packed into one integer, so two views of the same node
+    are equal and nodes can go in sets and be dict keys.
+
+    Setting walls to a list of four 0s and 1s writes them through to the wall array, so
+    grid[y][x].walls = [1, 0, 1, 1] changes the maze like it did when nodes held lists.
+
+    Args:
+        x: x position of the node
+        y: y position of the node
+        walls: view of the node's walls, a node outside of a maze gets its own
+    """
+
+    __slots__ = ('x', 'y', '_walls')
+
+    def __init__(self, x: int, y: int, walls: Walls = None):
         self.x = x
         self.y = y
 
-        # N S E W
-        self.walls = [1, 1, 1, 1]
+        # N S E W, a node outside of a maze gets a wall array of its own
+        if walls is None:
+            walls = Walls(np.full((1, 1), ALL_WALLS, dtype=np.uint8), 0, 0)
+
+        self._walls = walls
+
+    @property
+    def walls(self) -> Walls:
+        """View of the node's N S E W walls."""
+        return self._walls
+
+    @walls.setter
+    def walls(self, values):
+        values = list(values)
+        if len(values) != len(WALL_BITS):
+            raise ValueError(f"A node has {len(WALL_BITS)} walls, got {len(values)}")
+
+        walls = self._walls
+        walls.cells[walls.y, walls.x] = sum(bit for bit, value in zip(WALL_BITS, values) if value)
 
     def clear(self):
         """
         Resets the wall for the node
         """
-        self.walls = [1, 1, 1, 1]
+        self.walls.clear()
+
+    @property
+    def index(self) -> int:
+        """The position packed into one integer, y in the high 32 bits and x in the low."""
+        return self.y << 32 | self.x
+
+    def __hash__(self):
+        return self.y << 32 | self.x
+
+    def __eq__(self, other):
+        if type(other) is not Node:
+            return NotImplemented
+
+        return self.x == other.x and self.y == other.y
 
     def __repr__(self):
-        return str(self.__dict__)
+        return str({'x': self.x, 'y': self.y, 'walls': self.walls})
 
     def __str__(self):
-        return str(self.__dict__)
+        return str({'x': self.x, 'y': self.y, 'walls': self.walls})
 
     def __add__(self, other):
         if type(other) == Node:
@@ -36,8 +159,574 @@ class Node(object):
             return [self.x - other[0], self.y - other[1]]
 
 
+class Row(object):
+    """A single row of a Grid, indexing it gives a Node view of that position."""
+
+    def __init__(self, maze, y: int):
+        self.maze = maze
+        self.y = y
+
+    def __len__(self):
+        return self.maze.width
+
+    def __getitem__(self, x: int) -> Node:
+        x = range(self.maze.width)[x]
+        return Node(x, self.y, Walls(self.maze.cells, x, self.y))
+
+    def __iter__(self):
+        for x in range(self.maze.width):
+            yield self[x]
+
+
+class Grid(object):
+    """Lets grid[y][x] keep working on top of a maze's wall array.
+
+    Nodes are created on demand and read and write straight through to the array,
+    so nothing is stored per node.
+
+    Args:
+        maze: the maze that owns the wall array
+    """
+
+    def __init__(self, maze):
+        self.maze = maze
+
+    def __len__(self):
+        return self.maze.length
+
+    def __getitem__(self, y: int) -> Row:
+        return Row(self.maze, range(self.maze.length)[y])
+
+    def __iter__(self):
+        for y in range(self.maze.length):
+            yield self[y]
+
+
+def wall_canvas(cells: np.ndarray) -> np.ndarray:
+    """
+    Rasterizes a wall array onto a (2L+1)x(2W+1) canvas where nodes sit on the odd positions.
+
+    Args:
+        cells: uint8 array of N S E W wall bits, L nodes long and W nodes wide
+
+    Returns:
+        canvas: boolean array that is True wherever a wall is drawn
+    """
+    length, width = cells.shape
+    canvas = np.zeros((length * 2 + 1, width * 2 + 1), dtype=bool)
+
+    # a black border around the maze
+    canvas[[0, -1], :] = True
+    canvas[:, [0, -1]] = True
+
+    # an east wall fills in the column right of the node, from the corner above to the one below
+    east = (cells & EAST).astype(bool)
+    canvas[0:-1:2, 2::2] |= east
+    canvas[1::2, 2::2] |= east
+    canvas[2::2, 2::2] |= east
+
+    # a south wall fills in the row below the node, from the corner on the left to the one on the right
+    south = (cells & SOUTH).astype(bool)
+    canvas[2::2, 0:-1:2] |= south
+    canvas[2::2, 1::2] |= south
+    canvas[2::2, 2::2] |= south
+
+    return canvas
+
+
+class PNG_Writer(object):
+    """Writes a PNG a block of rows at a time so the whole image never has to be in memory.
+
+    Every scanline is stored with the Up filter, as its difference from the line above, so
+    repeated lines like the ones an upscale makes compress down to almost nothing.
+
+    Args:
+        name: name of the output file
+        width: width of the image in pixels
+        height: height of the image in pixels
+        mode: 'RGB' or 'L'
+    """
+
+    # PNG color type and channels for each supported mode
+    MODES = {'L': (0, 1), 'RGB': (2, 3)}
+
+    def __init__(self, name: str, width: int, height: int, mode: str = 'RGB'):
+        if mode not in self.MODES:
+            raise ValueError(f"Unsupported PNG mode '{mode}', expected one of {list(self.MODES)}")
+
+        self.width = width
+        self.height = height
+        self.channels = self.MODES[mode][1]
+        self.rows = 0
+
+        # the last scanline written, the Up filter of the first one is taken against zeros
+        self.previous = np.zeros(width * self.channels, dtype=np.uint8)
+
+        self.compressor = zlib.compressobj()
+        self.fh = open(name, 'wb')
+        self.fh.write(b'\x89PNG\r\n\x1a\n')
+        self._chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, self.MODES[mode][0], 0, 0, 0))
+
+    def _chunk(self, kind: bytes, data: bytes):
+        self.fh.write(struct.pack('>I', len(data)) + kind + data)
+        self.fh.write(struct.pack('>I', zlib.crc32(kind + data)))
+
+    def write(self, rows: np.ndarray):
+        """
+        Appends rows to the image
+
+        Args:
+            rows: uint8 array shaped (rows, width) for 'L' or (rows, width, 3) for 'RGB'
+        """
+        rows = rows.reshape(len(rows), self.width * self.channels)
+        if not len(rows):
+            return
+
+        # every scanline starts with a filter type byte, 2 for Up, followed by its difference from the line above
+        raw = np.full((len(rows), rows.shape[1] + 1), 2, dtype=np.uint8)
+        np.subtract(rows[0], self.previous, out=raw[0, 1:])
+        np.subtract(rows[1:], rows[:-1], out=raw[1:, 1:])
+        self.previous = rows[-1].copy()
+        self.rows += len(rows)
+
+        data = self.compressor.compress(raw.tobytes())
+        if data:
+            self._chunk(b'IDAT', data)
+
+    def close(self):
+        """Finishes the image, every row must have been written by now."""
+        if self.fh.closed:
+            return
+
+        self._chunk(b'IDAT', self.compressor.flush())
+        self._chunk(b'IEND', b'')
+        self.fh.close()
+
+        if self.rows != self.height:
+            raise ValueError(f"PNG expected {self.height} rows but {self.rows} were written")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def upscale_image(img: Image, scale=10, name: str = None, rows: int = None) -> Image:
+    """
+    Upscales an image with nearest neighbour sampling, the same way Image.resize(NEAREST) does.
+
+    Args:
+        img: image to upscale
+        scale: scale factor, or a pair of (x, y) factors, they don't have to be whole numbers
+        name: optional file to save the upscaled image to
+        rows: when saving, write the image in strips of this many output rows instead of
+              building the whole upscaled image in memory
+
+    Returns:
+        image: the upscaled image, or None when it was written in strips
+    """
+    scale_x, scale_y = scale if isinstance(scale, (tuple, list)) else (scale, scale)
+    size = (max(1, round(img.width * scale_x)), max(1, round(img.height * scale_y)))
+
+    if name is None or rows is None:
+        new_img = img.resize(size, Image.NEAREST)
+
+        if name is not None:
+            new_img.save(name)
+
+        return new_img
+
+    if img.mode not in PNG_Writer.MODES:
+        img = img.convert('RGB')
+
+    # source pixel for every output pixel, sampled from the pixel centers
+    arr = np.asarray(img)
+    xs = ((np.arange(size[0]) + 0.5) * (img.width / size[0])).astype(np.intp)
+    ys = ((np.arange(size[1]) + 0.5) * (img.height / size[1])).astype(np.intp)
+
+    with PNG_Writer(name, size[0], size[1], img.mode) as png:
+        for start in range(0, size[1], rows):
+            # widen each distinct source row once, then repeat whole rows to fill the strip
+            sources, repeats = np.unique(ys[start:start + rows], return_inverse=True)
+            png.write(np.take(arr[sources], xs, axis=1)[repeats])
+
+
+def pack_walls(cells: np.ndarray) -> np.ndarray:
+    """
+    Packs the south and east walls of every node into 2 bits, 4 nodes to a byte.
+
+    Args:
+        cells: uint8 array of N S E W wall bits
+
+    Returns:
+        packed: uint8 array with a row of ceil(width / 4) bytes for every row of nodes
+    """
+    length, width = cells.shape
+    codes = np.zeros((length, (width + 3) // 4 * 4), dtype=np.uint8)
+    codes[:, :width] = ((cells & SOUTH) >> 1) | ((cells & EAST) >> 1)
+
+    codes = codes.reshape(length, -1, 4)
+    return codes[:, :, 0] | (codes[:, :, 1] << 2) | (codes[:, :, 2] << 4) | (codes[:, :, 3] << 6)
+
+
+def unpack_walls(packed: np.ndarray, width: int, above: np.ndarray = None) -> np.ndarray:
+    """
+    Unpacks rows written by pack_walls back into N S E W wall bits.
+
+    Args:
+        packed: uint8 array of packed rows
+        width: the number of nodes wide
+        above: the packed row just above these rows, None when they start at the top of the maze
+
+    Returns:
+        cells: uint8 array of N S E W wall bits
+    """
+    def codes(rows):
+        shifts = np.array([0, 2, 4, 6], dtype=np.uint8)
+        return ((np.asarray(rows)[:, :, None] >> shifts) & 3).reshape(len(rows), -1)[:, :width]
+
+    current = codes(packed)
+    south = (current & 1).astype(bool)
+    east = (current & 2).astype(bool)
+
+    # north walls are the south walls of the row above, west walls the east walls to the left
+    north = np.ones_like(south)
+    north[1:] = south[:-1]
+    if above is not None:
+        north[0] = (codes(above)[0] & 1).astype(bool)
+
+    west = np.ones_like(east)
+    west[:, 1:] = east[:, :-1]
+
+    return (north * NORTH | south * SOUTH | east * EAST | west * WEST).astype(np.uint8)
+
+
+def pack_seed(seed) -> tuple:
+    """
+    Fits a seed into the signed 64 bit field of a binary maze header
+
+    Flag bit 0 says there is a seed, bit 1 that it's 2**63 or more and was stored as the
+    same 64 bits read as signed.
+
+    Args:
+        seed: an integer seed from 0 to 2**64 - 1 or down to -2**63, or None
+
+    Returns:
+        flags: the header flags for the seed
+        value: the signed value to store
+    """
+    if seed is None:
+        return 0, 0
+
+    if not isinstance(seed, (int, np.integer)) or not -2 ** 63 <= seed < 2 ** 64:
+        raise ValueError(f"Seed {seed!r} can't be saved, it has to be an integer that fits in 64 bits")
+
+    seed = int(seed)
+    if seed >= 2 ** 63:
+        return 3, seed - 2 ** 64
+
+    return 1, seed
+
+
+def unpack_seed(flags: int, value: int):
+    """The seed pack_seed stored as value with flags, None if there wasn't one."""
+    if not flags & 1:
+        return None
+
+    return value + 2 ** 64 if flags & 2 else value
+
+
+def open_binary(name: str) -> tuple:
+    """
+    Reads the header of a binary maze file and memory maps its packed walls, see Maze.save_binary
+
+    Args:
+        name: name of the binary maze file
+
+    Returns:
+        packed: memory mapped uint8 array with a row of packed bytes for every row of nodes
+        length: the number of nodes long
+        width: the number of nodes wide
+        flags: the header flags, pass them to unpack_seed with seed
+        seed: the seed as stored in the header
+        algorithm: the generation method, None if it wasn't saved
+    """
+    with open(name, 'rb') as fh:
+        header = fh.read(BINARY_HEADER.size)
+
+    if len(header) < BINARY_HEADER.size or header[:4] != BINARY_MAGIC:
+        raise ValueError(f"{name} isn't a binary maze file")
+
+    _, version, flags, length, width, seed, algorithm = BINARY_HEADER.unpack(header)
+    if version != BINARY_VERSION:
+        raise ValueError(f"{name} is version {version} of the binary maze format, expected {BINARY_VERSION}")
+
+    packed = np.memmap(name, dtype=np.uint8, mode='r', offset=BINARY_HEADER.size, shape=(length, (width + 3) // 4))
+
+    return packed, length, width, flags, seed, algorithm.rstrip(b'\0').decode('ascii') or None
+
+
+def walls_consistent(cells: np.ndarray) -> bool:
+    """
+    Checks every wall agrees from both sides and the outer walls are all up
+
+    Args:
+        cells: uint8 array of N S E W wall bits
+
+    Returns:
+        consistent: True if the walls make sense as a maze
+    """
+    across = (((cells[:, :-1] & EAST) > 0) == ((cells[:, 1:] & WEST) > 0)).all()
+    down = (((cells[:-1] & SOUTH) > 0) == ((cells[1:] & NORTH) > 0)).all()
+    closed = (cells[0] & NORTH).all() and (cells[-1] & SOUTH).all() and \
+        (cells[:, 0] & WEST).all() and (cells[:, -1] & EAST).all()
+
+    return bool(across and down and closed)
+
+
+def open_edges(cells: np.ndarray) -> tuple:
+    """
+    Every pair of neighboring nodes with no wall between them
+
+    Args:
+        cells: uint8 array of N S E W wall bits
+
+    Returns:
+        first: flat index (y * width + x) of the node on the west or north side
+        second: flat index of the node on the east or south side
+    """
+    length, width = cells.shape
+    index = np.arange(length * width, dtype=np.intp).reshape(length, width)
+
+    east = (cells[:, :-1] & EAST) == 0
+    south = (cells[:-1] & SOUTH) == 0
+
+    first = np.concatenate([index[:, :-1][east], index[:-1][south]])
+    second = np.concatenate([index[:, 1:][east], index[1:][south]])
+
+    return first, second
+
+
+def connected_components(count: int, first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    """
+    Union find over a whole array of edges at once
+
+    Every round each component's root is hooked onto the smallest root it shares an edge
+    with, then pointers are jumped until every node points straight at its root. Both
+    steps are whole-array operations so there's no Python loop over the edges.
+
+    Args:
+        count: number of nodes
+        first: one end of every edge
+        second: the other end of every edge
+
+    Returns:
+        labels: for every node the smallest node index in its component
+    """
+    labels = np.arange(count, dtype=np.intp)
+
+    while True:
+        a, b = labels[first], labels[second]
+        crossing = a != b
+        if not crossing.any():
+            return labels
+
+        # hook the larger root onto the smaller one, the smallest wins when several hook onto the same root
+        np.minimum.at(labels, np.maximum(a, b)[crossing], np.minimum(a, b)[crossing])
+
+        # pointer jumping flattens every tree back down to its root
+        while True:
+            jumped = labels[labels]
+            if (jumped == labels).all():
+                break
+            labels = jumped
+
+
+def eller_rows(length: int, width: int, seed: int = None):
+    """
+    A generator that builds a maze one row at a time with Eller's algorithm.
+
+    Only the current row and the set every node of it belongs to are kept, so memory
+    grows with the width and never with the length. Nodes in the same set are already
+    joined by a path. Neighbors in different sets are randomly joined, then every set
+    sends at least one node down into the next row, and the last row joins everything
+    left over so the maze comes out perfect.
+
+    Args:
+        length: the number of nodes long
+        width: the number of nodes wide
+        seed: optional seed to make the generated maze reproducible
+
+    Returns:
+        row: uint8 array of the N S E W wall bits of the next row of nodes
+    """
+    rng = _random(seed)
+
+    # set label of every node in the current row, nodes that came down from the row above keep theirs
+    sets = list(range(width))
+    next_label = width
+    down = [False] * width
+
+    for y in range(length):
+        last = y == length - 1
+        row = np.full(width, ALL_WALLS, dtype=np.uint8)
+        row[np.array(down, dtype=bool)] &= ALL_WALLS ^ NORTH
+
+        # union find over this row's labels so joining two sets doesn't relabel the whole row
+        parents = {}
+
+        def find(label):
+            root = label
+            while parents.get(root, root) != root:
+                root = parents[root]
+            while label != root:
+                parents[label], label = root, parents.get(label, label)
+            return root
+
+        for x in range(width - 1):
+            left, right = find(sets[x]), find(sets[x + 1])
+
+            if left != right and (last or rng.random() < 0.5):
+                row[x] &= ALL_WALLS ^ EAST
+                row[x + 1] &= ALL_WALLS ^ WEST
+                parents[right] = left
+
+        if last:
+            yield row
+            return
+
+        # every set goes down at least once so none of them get cut off
+        members = {}
+        for x in range(width):
+            sets[x] = find(sets[x])
+            members.setdefault(sets[x], []).append(x)
+
+        down = [False] * width
+        for nodes in members.values():
+            chosen = [x for x in nodes if rng.random() < 0.5] or [rng.choice(nodes)]
+            for x in chosen:
+                down[x] = True
+
+        row[np.array(down, dtype=bool)] &= ALL_WALLS ^ SOUTH
+        yield row
+
+        # nodes that didn't come down start off in sets of their own
+        for x in range(width):
+            if not down[x]:
+                sets[x] = next_label
+                next_label += 1
+
+
+def canvas_rows(rows):
+    """
+    A generator that turns rows of wall bits into the rows of their wall_canvas as they arrive.
+
+    The corners between two rows depend on the east walls of both, so each row is drawn
+    together with the one before it and only the canvas rows that are done are yielded.
+
+    Args:
+        rows: iterable of uint8 arrays of N S E W wall bits, one row of nodes each
+
+    Returns:
+        canvas: boolean block of canvas rows, True wherever a wall is drawn
+    """
+    previous = None
+
+    for row in rows:
+        if previous is None:
+            yield wall_canvas(row[None])[:2]
+        else:
+            yield wall_canvas(np.stack([previous, row]))[2:4]
+
+        previous = row
+
+    if previous is not None:
+        yield np.ones((1, len(previous) * 2 + 1), dtype=bool)
+
+
+def _ends(blocks):
+    """A generator that yields every block of canvas rows with whether it's the first and last block."""
+    previous, first = None, True
+
+    for block in blocks:
+        if previous is not None:
+            yield previous, first, False
+            first = False
+
+        previous = block
+
+    if previous is not None:
+        yield previous, first, True
+
+
+def _ascii_text(chars: np.ndarray) -> bytes:
+    """The text simple_ascii saves, every character is followed by a space except the last on a line gets a newline."""
+    text = np.full((chars.shape[0], chars.shape[1] * 2), ord(' '), dtype=np.uint8)
+    text[:, ::2] = chars
+    text[:, -1] = ord('\n')
+
+    return text.tobytes()
+
+
+def write_canvas_png(blocks, length: int, width: int, name: str = 'maze.png'):
+    """
+    Writes blocks of canvas rows as they arrive as the 1:1 image convert_to_image makes
+
+    Args:
+        blocks: iterable of boolean blocks of canvas rows that stack up into the whole canvas
+        length: the number of nodes long
+        width: the number of nodes wide
+        name: name of the output image
+    """
+    with PNG_Writer(name, width * 2 + 1, length * 2 + 1) as png:
+        for block, first, last in _ends(blocks):
+            pixels = np.repeat(np.where(block, np.uint8(0), np.uint8(255))[:, :, None], 3, axis=2)
+
+            # places a green and red color for the start and end
+            if first:
+                pixels[0, 1] = (0, 255, 0)
+            if last:
+                pixels[-1, -2] = (255, 0, 0)
+
+            png.write(pixels)
+
+
+def write_canvas_ascii(blocks, name: str = 'maze.txt'):
+    """
+    Writes blocks of canvas rows as they arrive as the text simple_ascii saves
+
+    Args:
+        blocks: iterable of boolean blocks of canvas rows that stack up into the whole canvas
+        name: name of the output text file
+    """
+    with open(name, 'wb') as fh:
+        for block, first, last in _ends(blocks):
+            chars = np.where(block, np.uint8(ord('#')), np.uint8(ord('.')))
+
+            if first:
+                chars[0, 1] = ord('S')
+            if last:
+                chars[-1, -2] = ord('E')
+
+            fh.write(_ascii_text(chars))
+
+
+def write_png_rows(rows, length: int, width: int, name: str = 'maze.png'):
+    """Writes rows of wall bits as they arrive, from eller_rows say, as the image convert_to_image makes."""
+    write_canvas_png(canvas_rows(rows), length, width, name)
+
+
+def write_ascii_rows(rows, name: str = 'maze.txt'):
+    """Writes rows of wall bits as they arrive, from eller_rows say, as the text simple_ascii saves."""
+    write_canvas_ascii(canvas_rows(rows), name)
+
+
 class Maze(object):
-    """A Maze object that holds a 2d array of nodes. Can generate a maze with 2 different methods.
+    """A Maze object that holds its walls in a packed 2d array. Can generate a maze with 4 different methods.
+
+    Each entry of cells is a uint8 with the N S E W wall bits of a node, grid gives
+    Node views of the same array for code that works with grid[y][x].
 
     Args:
         length: the number of nodes long
@@ -49,46 +738,68 @@ class Maze(object):
         self.length = length
         self.width = width
 
-        # create a 2d array of nodes
-        self.grid = [[Node(x, y) for x in range(self.width)] for y in range(self.length)]
+        # create a 2d array of walls, every node starts with all four
+        self.cells = np.full((self.length, self.width), ALL_WALLS, dtype=np.uint8)
+        self.grid = Grid(self)
         self.start_node = Node(0, 0)
 
+        # how the current maze was generated, set by generate
+        self.algorithm = None
+        self.seed = None
+
+        # how many times the last generator stepped onto a node, counting the one it starts on
+        self.cells_visited = 0
+
+        # optional Profiler.Profiler that times the generators, renderers and readers
+        self.profiler = None
+
+        # functions of (x, y, wall) called after every change_wall, see subscribe
+        self.subscribers = []
+
+    @property
+    def start_pos(self) -> list:
+        """Board position [x, y] of the opening in the outer wall above the first node."""
+        return [1, 0]
+
+    @property
+    def exit_pos(self) -> list:
+        """Board position [x, y] of the opening in the outer wall below the last node."""
+        return [self.width * 2 - 1, self.length * 2]
+
     def change_wall(self, x: int, y: int, wall: int):
-        if wall == 0:
-            
-            # Ensures if wall is edge of map or not
-            if y == 0:
-                self.grid[y][x].walls[0] = int(not self.grid[y][x].walls[0])
-            else:
-                self.grid[y][x].walls[0] = int(not self.grid[y][x].walls[0])
-                self.grid[y - 1][x].walls[1] = int(not self.grid[y - 1][x].walls[1])
+        """
+        Toggles a wall of a node along with the matching wall of the node on the other side
 
-        elif wall == 1:
+        Args:
+            x: x position of the node
+            y: y position of the node
+            wall: wall index to toggle (N S E W)
+        """
+        self.cells[y, x] ^= WALL_BITS[wall]
 
-            # Ensures if wall is edge of map or not
-            if y == self.length - 1:
-                self.grid[y][x].walls[1] = int(not self.grid[y][x].walls[1])
-            else:
-                self.grid[y][x].walls[1] = int(not self.grid[y][x].walls[1])
-                self.grid[y + 1][x].walls[0] = int(not self.grid[y + 1][x].walls[0])
-
-        elif wall == 2:
-            
-            # Ensures if wall is edge of map or not
-            if x == self.width - 1:
-                self.grid[y][x].walls[2] = int(not self.grid[y][x].walls[2])
-            else:
-                self.grid[y][x].walls[2] = int(not self.grid[y][x].walls[2])
-                self.grid[y][x + 1].walls[3] = int(not self.grid[y][x + 1].walls[3])
-
-        elif wall == 3:
-            
-            # Ensures if wall is edge of map or not
-            if x == 0:
-                self.grid[y][x].walls[3] = int(not self.grid[y][x].walls[3])
-            else:
-                self.grid[y][x].walls[3] = int(not self.grid[y][x].walls[3])
-                self.grid[y][x - 1].walls[2] = int(not self.grid[y][x - 1].walls[2])
+        # Ensures if wall is edge of map or not
+        next_x, next_y = x + DIRECTIONS[wall][0], y + DIRECTIONS[wall][1]
+        if 0 <= next_x < self.width and 0 <= next_y < self.length:
+            self.cells[next_y, next_x] ^= WALL_BITS[wall ^ 1]
+
+        for callback in self.subscribers:
+            callback(x, y, wall)
+
+    def subscribe(self, callback):
+        """
+        Registers a function to call every time change_wall toggles a wall
+
+        Only change_wall is watched, generating or loading a maze replaces the walls without telling anyone.
+
+        Args:
+            callback: function of (x, y, wall) with the same arguments change_wall was given,
+                      called after both sides of the wall are toggled
+        """
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        """Stops calling a function registered with subscribe."""
+        self.subscribers.remove(callback)
 
     def neighbors(self, x: int, y: int, diagonal: bool = False):
         """A generator that yields neighboring values.
@@ -131,13 +842,11 @@ class Maze(object):
             bool: if there is a wall exists or doesn't between the two nodes
         """
 
-        # North and East walls always have their neighbor +1 from their direction
-        if wall in [0, 2]:
-            return first.walls[wall] == second.walls[wall + 1]
+        # the matching wall on the other node is always the paired index (N-S, E-W)
+        first_wall = self.cells[first.y, first.x] & WALL_BITS[wall]
+        second_wall = self.cells[second.y, second.x] & WALL_BITS[wall ^ 1]
 
-        # South and West walls always have their neighbor -1 from their direction
-        elif wall in [1, 3]:
-            return first.walls[wall] == second.walls[wall - 1]
+        return bool(first_wall) == bool(second_wall)
 
     def _convert_pos(self, position):
         """
@@ -148,25 +857,36 @@ class Maze(object):
         Returns:
             index: wall index of where the wall should be removed
         """
-        directions = {
-            "N": [0, -1],
-            "S": [0, 1],
-            "E": [1, 0],
-            "W": [-1, 0]
-        }
-
-        for x, y in directions.items():
-            if position == y:
-                return list(directions.keys()).index(x)
+        for index, direction in enumerate(DIRECTIONS):
+            if position == list(direction):
+                return index
 
     def clear(self):
         """
         Resets the maze by resetting the walls for each node
         """
 
-        for y in range(self.length):
-            for x in range(self.width):
-                self.grid[y][x].clear()
+        self.cells.fill(ALL_WALLS)
+
+    def is_perfect(self) -> bool:
+        """
+        Checks that the maze is a spanning tree of its nodes, every node can reach every other by exactly one path.
+
+        The walls have to agree from both sides and the outer walls have to be up, then a
+        tree is connected with one fewer open wall than there are nodes.
+
+        Returns:
+            perfect: True if the maze is connected and has no loops
+        """
+        cells = self.cells
+        if not walls_consistent(cells):
+            return False
+
+        first, second = open_edges(cells)
+        if len(first) != cells.size - 1:
+            return False
+
+        return bool((connected_components(cells.size, first, second) == 0).all())
 
     def display_maze(self):
         """
@@ -216,6 +936,7 @@ class Maze(object):
 
             print("".join(row))
 
+    @timed()
     def convert_to_image(self, name:str='maze.png', save:bool=True) -> Image:
         """
         Converts maze into an image. When saving, two images are generated 
@@ -228,43 +949,13 @@ class Maze(object):
         Returns:
             image: Returns the Pillow image for possible uses
         """
-        # setup a blank, white image
-        l, w = (self.length * 2) + 1, (self.width * 2) + 1
-        img = Image.new('RGB', (w, l), color=(255, 255, 255))
-        arr = np.array(img)
-
-        # add a black border around the maze
-        arr[0, :] = (0, 0, 0)
-        arr[:, 0] = (0, 0, 0)
-        arr[l - 1, :] = (0, 0, 0)
-        arr[:, w - 1] = (0, 0, 0)
-
-        for y in range(self.length):
-            for x in range(self.width):
-
-                # create an array where all of the node positions of the image in the x and y axis are made
-                translate_y = [i + 1 for i in list(range(0, l - 1, 2))]
-                translate_x = [i + 1 for i in list(range(0, w - 1, 2))]
-                current = self.grid[y][x]
-
-                # if an east wall exists then fill in the nearby pixels with black
-                if current.walls[2]:
-                    arr[translate_y[y], translate_x[x] + 1] = (0, 0, 0)
-                    arr[translate_y[y] + 1, translate_x[x] + 1] = (0, 0, 0)
-                    arr[translate_y[y] - 1, translate_x[x] + 1] = (0, 0, 0)
-
-                # if a south wall exists then fill in the nearby pixels with black
-                if current.walls[1]:
-                    arr[translate_y[y] + 1, translate_x[x] + 1] = (0, 0, 0)
-                    arr[translate_y[y] + 1, translate_x[x] - 1] = (0, 0, 0)
-                    arr[translate_y[y] + 1, translate_x[x]] = (0, 0, 0)
+        # white image with every wall pixel blacked out
+        walls = wall_canvas(self.cells)
+        new_img = Image.fromarray(np.where(walls, np.uint8(0), np.uint8(255)), 'L').convert('RGB')
 
         # places a green and red color for the start and end
-        arr[0, 1] = (0, 255, 0)
-        arr[l - 1, w - 2] = (255, 0, 0)
-
-        # convert to image for potential uses
-        new_img = Image.fromarray(arr.astype('uint8'), 'RGB')
+        new_img.putpixel(tuple(self.start_pos), (0, 255, 0))
+        new_img.putpixel(tuple(self.exit_pos), (255, 0, 0))
 
         if save:
             new_img.save(name)
@@ -274,18 +965,10 @@ class Maze(object):
         return new_img
 
     def upscale_image(self, img:Image, scale:int=10) -> Image:
-        l, w = (self.length * 2) + 1, (self.width * 2) + 1
-
-        im = Image.new('RGB', (l*scale, w*scale), (0, 0, 0))
-        draw = ImageDraw.Draw(im)
-        arr = np.array(img)
-
-        for y in range(l):
-            for x in range(w):
-                draw.rectangle([(x * scale, y * scale), ((x + 1) * scale, (y + 1) * scale)], fill=tuple(arr[y,x]))
-
-        return im
+        """Nearest neighbour upscale of a maze image, see the module level upscale_image."""
+        return upscale_image(img, scale)
 
+    @timed()
     def simple_ascii(self, name:str="maze.txt", save:bool=True):
         """Generates maze as a string array.
 
@@ -297,142 +980,356 @@ class Maze(object):
             arr: string array
         """
 
-        l, w = (self.length * 2) + 1, (self.width * 2) + 1
+        chars = np.where(wall_canvas(self.cells), np.uint8(ord('#')), np.uint8(ord('.')))
+        chars[self.start_pos[1], self.start_pos[0]] = ord('S')
+        chars[self.exit_pos[1], self.exit_pos[0]] = ord('E')
 
-        arr = [['.' for _ in range(w)] for _ in range(l)]
+        if save:
+            with open(f"{name}", "wb") as fh:
+                fh.write(_ascii_text(chars))
 
-        for x in range(l):
-            arr[0][x] = '#'
-            arr[l-1][x] = '#'
+        # split the characters back up into rows of single character strings
+        text, row = chars.tobytes().decode('ascii'), chars.shape[1]
+        return [list(text[i:i + row]) for i in range(0, len(text), row)]
 
-        for x in range(w):
-            arr[x][0] = '#'
-            arr[x][w - 1] = '#'
+    @timed()
+    def read_picture(self, name:str='maze.png', threshold:int=255):
+        """
+        Reads in an image of a maze. Maze must be 1:1 in terms of pixel to node
 
-        for y in range(self.length):
-            for x in range(self.width):
-                translate_y = [i + 1 for i in list(range(0, l - 1, 2))]
-                translate_x = [i + 1 for i in list(range(0, w - 1, 2))]
-                current = self.grid[y][x]
+        Args:  
+            name: name of the input image
+            threshold: a pixel is open (white) when every channel is at least this value
+        
+        Returns: 
+            None
 
-                if current.walls[2]:
-                    arr[translate_y[y]][translate_x[x] + 1] = '#'
-                    arr[translate_y[y] + 1][translate_x[x] + 1] = '#'
-                    arr[translate_y[y] - 1][translate_x[x] + 1] = '#'
+        Raises:
+            ValueError: if the image isn't laid out one pixel per node and wall
+        """
 
-                if current.walls[1]:
-                    arr[translate_y[y] + 1][translate_x[x] + 1] = '#'
-                    arr[translate_y[y] + 1][translate_x[x] - 1] = '#'
-                    arr[translate_y[y] + 1][translate_x[x]] = '#'
+        img = Image.open(name)
+        if img.mode not in ('L', 'RGB', 'RGBA'):
+            img = img.convert('RGB')
+
+        # threshold the whole image once, a pixel is only open if all of its channels are
+        channels = np.asarray(img) >= threshold
+        if channels.ndim == 2:
+            channels = channels[:, :, None]
+
+        open_pixels = channels[:, :, 0].copy()
+        for i in range(1, channels.shape[2]):
+            open_pixels &= channels[:, :, i]
+
+        height, width = open_pixels.shape
+        if height < 3 or width < 3 or height % 2 == 0 or width % 2 == 0:
+            raise ValueError(f"{name} is {width}x{height} pixels, a maze image needs odd dimensions "
+                             f"of at least 3 so that there is one pixel per node and wall")
+
+        # every node sits on an odd pixel and has to be open
+        closed = np.argwhere(~open_pixels[1::2, 1::2])
+        if len(closed) > 0:
+            y, x = closed[0]
+            raise ValueError(f"{name} has {len(closed)} node pixels that aren't open, "
+                             f"the first is at ({x * 2 + 1}, {y * 2 + 1})")
+
+        self.width = (width - 1) // 2
+        self.length = (height - 1) // 2
+        cells = np.full((self.length, self.width), ALL_WALLS, dtype=np.uint8)
+
+        # an open pixel between two nodes removes the wall on both sides of it
+        south = open_pixels[2:-1:2, 1::2]
+        cells[:-1] &= np.where(south, ALL_WALLS ^ SOUTH, ALL_WALLS).astype(np.uint8)
+        cells[1:] &= np.where(south, ALL_WALLS ^ NORTH, ALL_WALLS).astype(np.uint8)
+
+        east = open_pixels[1::2, 2:-1:2]
+        cells[:, :-1] &= np.where(east, ALL_WALLS ^ EAST, ALL_WALLS).astype(np.uint8)
+        cells[:, 1:] &= np.where(east, ALL_WALLS ^ WEST, ALL_WALLS).astype(np.uint8)
+
+        self.cells = cells
+
+        # a scanned picture doesn't say how it was generated
+        self.algorithm = None
+        self.seed = None
+
+    @timed()
+    def save_binary(self, name:str='maze.bin'):
+        """
+        Saves the maze in a compact binary format.
 
-        arr[0][1] = 'S'
-        arr[l - 1][w - 2] = 'E'
+        A header with the dimensions, seed and algorithm is followed by 2 bits per node
+        (bit 0 for the south wall, bit 1 for the east wall) packed 4 nodes to a byte with
+        every row padded to a whole byte. North and west walls are the south and east walls
+        of the neighbors, and the outer walls are always up.
 
-        if save:
-            with open(f"{name}", "w") as fh:
-                for x in arr:
-                    fh.write(f"{' '.join(x)}\n")
+        Args:
+            name: name of the output file
+        """
+        flags, seed = pack_seed(self.seed)
+        algorithm = (self.algorithm or '').encode('ascii')
+
+        if len(algorithm) > 16:
+            raise ValueError(f"Algorithm name '{self.algorithm}' is too long to save, 16 characters at most")
+
+        header = BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, flags, self.length, self.width, seed, algorithm)
 
-        return arr
+        with open(name, 'wb') as fh:
+            fh.write(header)
+            fh.write(pack_walls(self.cells).tobytes())
 
-    def read_picture(self, name:str='maze.png'):
+    @timed()
+    def load_binary(self, name:str='maze.bin', rows:tuple=None):
         """
-        Reads in an image of a maze. Maze must be 1:1 in terms of pixel to node
+        Loads a maze saved with save_binary.
 
-        Args:  
-            Name: name of the input image
-        
-        Returns: 
+        This isn't out of core loading. The packed walls are unpacked a block of rows at a
+        time, but the loaded maze takes a byte per node, 4 times the size of the file, so
+        the whole maze has to fit in memory. Use Tiled.board_bands to draw a maze that doesn't.
+
+        Loading just a band of rows gives a maze of its own: the band's top and bottom walls
+        are closed, so its start, exit and paths aren't those of the full maze. It is for
+        looking at a piece of the maze, not for solving it.
+
+        Args:
+            name: name of the input file
+            rows: optional (start, stop) range of rows to load
+
+        Returns:
             None
         """
+        packed, length, width, flags, seed, algorithm = open_binary(name)
 
-        img = Image.open(name)
-        arr = np.array(img)
+        start, stop = rows if rows is not None else (0, length)
+        if not 0 <= start < stop <= length:
+            raise ValueError(f"Rows {start} to {stop} are outside of the {length} rows in {name}")
 
-        self.width = (img.width - 1) // 2
-        self.length = (img.height - 1) // 2
+        self.length = stop - start
+        self.width = width
+        self.seed = unpack_seed(flags, seed)
+        self.algorithm = algorithm
+        self.cells = np.empty((self.length, self.width), dtype=np.uint8)
 
-        self.grid = [[Node(x, y) for x in range(self.width)] for y in range(self.length)]
+        # unpack about a megabyte of the file at a time
+        block = max(1, (1 << 20) // packed.shape[1])
+        for top in range(start, stop, block):
+            bottom = min(top + block, stop)
 
-        for y in range(1, img.height, 2):
-            for x in range(1, img.width, 2):
-                translated_pos = self._translate_pos(x, y)
-                current = self.grid[translated_pos[1]][translated_pos[0]]
+            # the row above a band is needed for its north walls
+            above = packed[top - 1:top] if top > 0 else None
+            self.cells[top - start:bottom - start] = unpack_walls(packed[top:bottom], width, above)
 
-                if y+1 <= img.height-1:
-                    if all([i==255 for i in arr[y+1, x]]):
-                        self.grid[current.y+1][current.x].walls[0] = 0
-                        current.walls[1] = 0
+        # a band loaded out of the middle of a maze still gets a closed outer wall
+        self.cells[0] |= NORTH
+        self.cells[-1] |= SOUTH
 
-                if x+1 <= img.width-1:
-                    if all([i==255 for i in arr[y, x+1]]):
-                        self.grid[current.y][current.x+1].walls[3] = 0
-                        current.walls[2] = 0
+    @timed(counters=lambda self: {'cells_visited': self.cells_visited})
+    def iterative_backtrack(self, seed: int = None):
+        """Uses backtracking to explore all nodes randomly to generate maze.
 
-    def _translate_pos(self, x:int, y:int):
-        new_pos = [0, 0]
+        Nodes are tracked by their flat index (y * width + x) with a bytearray for
+        the visited nodes, so each node is pushed and popped once.
 
-        if x == 1:
-            new_pos[0] = 0
-        else:
-            new_pos[0] = x//2
+        Args:
+            seed: optional seed to make the generated maze reproducible
+        """
+        rng = _random(seed)
+        walls = memoryview(self.cells.reshape(-1))
+        width, total = self.width, self.width * self.length
+
+        # start stack with the starting node and mark it as visited
+        start = self.start_node.y * width + self.start_node.x
+        visited = bytearray(total)
+        visited[start] = 1
+        stack = [start]
+
+        while stack:
+            current = stack[-1]
+            x = current % width
+
+            # get the walls that lead to a neighbor that hasn't been visited
+            available_walls = []
+            if current >= width and not visited[current - width]:
+                available_walls.append(0)
+            if current + width < total and not visited[current + width]:
+                available_walls.append(1)
+            if x + 1 < width and not visited[current + 1]:
+                available_walls.append(2)
+            if x > 0 and not visited[current - 1]:
+                available_walls.append(3)
+
+            # dead end so backtrack to the previous node
+            if not available_walls:
+                stack.pop()
+                continue
+
+            # knock down the wall between the current node and a random neighbor
+            next_cell = self._knock_down(walls, current, rng.choice(available_walls))
+
+            visited[next_cell] = 1
+            stack.append(next_cell)
+
+        # every node but the first is stepped onto going forward and its parent again backing out of it
+        self.cells_visited = 2 * total - 1
+
+    @timed(counters=lambda self: {'cells_visited': self.cells_visited})
+    def Aldous_Broder(self, seed: int = None):
+        """Random walk that knocks down a wall whenever it steps onto a node it hasn't visited.
+
+        A count of the unvisited nodes is kept so the walk knows when it's done
+        without rescanning the maze.
 
-        if y == 1:
-            new_pos[1] = 0
-        else:
-            new_pos[1] = y//2
+        Args:
+            seed: optional seed to make the generated maze reproducible
+        """
+        rng = _random(seed)
+        walls = memoryview(self.cells.reshape(-1))
+
+        current = self.start_node.y * self.width + self.start_node.x
+        visited = bytearray(self.width * self.length)
+        visited[current] = 1
+        remaining = len(visited) - 1
+        steps = 1
+
+        while remaining > 0:
+            wall = rng.choice(self._inner_walls(current))
+            next_cell = current + self._offsets[wall]
+            steps += 1
+
+            if not visited[next_cell]:
+                self._knock_down(walls, current, wall)
+                visited[next_cell] = 1
+                remaining -= 1
+
+            current = next_cell
+
+        self.cells_visited = steps
+
+    @timed(counters=lambda self: {'cells_visited': self.cells_visited})
+    def Wilson(self, seed: int = None):
+        """Loop-erased random walks from every node not yet in the maze until they hit it.
+
+        Gives the same uniform spanning tree as Aldous_Broder but without the long
+        walks over nodes that are already part of the maze.
+
+        Args:
+            seed: optional seed to make the generated maze reproducible
+        """
+        rng = _random(seed)
+        walls = memoryview(self.cells.reshape(-1))
+
+        in_maze = bytearray(self.width * self.length)
+        in_maze[self.start_node.y * self.width + self.start_node.x] = 1
+
+        # the last wall the walk left each node through, overwriting it erases loops
+        exits = bytearray(len(in_maze))
+        steps = 1
+
+        for first in range(len(in_maze)):
+            # walk randomly until the walk runs into the maze
+            current = first
+            while not in_maze[current]:
+                wall = rng.choice(self._inner_walls(current))
+                exits[current] = wall
+                current += self._offsets[wall]
+                steps += 1
 
-        return new_pos
+            # retrace the loop-erased walk and add it to the maze
+            current = first
+            while not in_maze[current]:
+                in_maze[current] = 1
+                current = self._knock_down(walls, current, exits[current])
 
-    def iterative_backtrack(self):
-        """Uses backtracking to explore all nodes randomly to generate maze."""
+        self.cells_visited = steps
 
-        # start stack with the starting node and an empty array of visited positions
-        stack = [self.start_node]
-        visited = []
+    @timed(counters=lambda self: {'cells_visited': self.cells_visited})
+    def Eller(self, seed: int = None):
+        """Fills the maze in one row at a time with Eller's algorithm, see eller_rows.
 
-        while len(stack) > 0:
-            # remove node from stack and add it to visited array
-            current = stack.pop()
-            visited.append((current.x, current.y))
+        Args:
+            seed: optional seed to make the generated maze reproducible
+        """
+        for y, row in enumerate(eller_rows(self.length, self.width, seed)):
+            self.cells[y] = row
+
+        self.cells_visited = self.length * self.width
+
+    @timed()
+    def generate(self, method: str = 'backtrack', seed: int = None):
+        """
+        Clears the maze and generates a new one
+
+        Args:
+            method: generator to use, one of 'backtrack', 'aldous_broder', 'wilson' or 'eller'
+            seed: optional seed to make the generated maze reproducible
+        """
+        generators = {
+            'backtrack': self.iterative_backtrack,
+            'aldous_broder': self.Aldous_Broder,
+            'wilson': self.Wilson,
+            'eller': self.Eller
+        }
+
+        if method not in generators:
+            raise ValueError(f"Unknown generation method '{method}', expected one of {list(generators)}")
+
+        self.clear()
+        generators[method](seed=seed)
 
-            # get available neighbors and randomly shuffle them
-            available_nodes = [x for x in self.neighbors(current.x, current.y) if not (x.x, x.y) in visited]
-            random.shuffle(available_nodes)
+        self.algorithm = method
+        self.seed = seed
 
-            # checks if there are at least 1 available node to visit
-            if len(available_nodes) > 0:
-                # add first node to the stack and get it's direction from current node
-                stack.append(current)
-                next_cell = available_nodes.pop()
-                position = next_cell - current
+    @property
+    def _offsets(self) -> tuple:
+        """Change in flat index for moving through each wall (N S E W)."""
+        return (-self.width, self.width, 1, -1)
 
-                wall = self._convert_pos(position)
-                self.change_wall(current.x, current.y, wall)
+    def _inner_walls(self, index: int) -> list:
+        """
+        Gets the walls of a node that lead to another node rather than off the maze
+
+        Args:
+            index: flat index of the node (y * width + x)
 
-                stack.append(next_cell)
+        Returns:
+            walls: wall indices (N S E W) with a node on the other side
+        """
+        y, x = divmod(index, self.width)
+        walls = []
 
-    def Aldous_Broder(self):
-        current = self.start_node
-        visited = []
+        if y > 0:
+            walls.append(0)
+        if y < self.length - 1:
+            walls.append(1)
+        if x < self.width - 1:
+            walls.append(2)
+        if x > 0:
+            walls.append(3)
 
-        while not all([(x, y) in visited for x in range(self.width) for y in range(self.length)]):
-            available_nodes = [i for i in self.neighbors(current.x, current.y)]
-            next_node = random.choice(available_nodes)
+        return walls
 
-            if not (next_node.x, next_node.y) in visited:
-                position = next_node - current
-                wall = self._convert_pos(position)
+    def _knock_down(self, walls: memoryview, index: int, wall: int) -> int:
+        """
+        Removes a wall of a node along with the matching wall of its neighbor
+
+        Args:
+            walls: flat memoryview of the wall array
+            index: flat index of the node
+            wall: wall index to remove (N S E W)
+
+        Returns:
+            next_cell: flat index of the neighbor on the other side of the wall
+        """
+        next_cell = index + self._offsets[wall]
 
-                self.change_wall(current.x, current.y, wall)
+        walls[index] &= ALL_WALLS ^ WALL_BITS[wall]
+        walls[next_cell] &= ALL_WALLS ^ WALL_BITS[wall ^ 1]
 
-            visited.append((current.x, current.y))
-            current = next_node
+        return next_cell
 
 
 def main():
     m = Maze(length=25, width=25)
-    m.Aldous_Broder()
+    m.generate('aldous_broder')
 
     m.convert_to_image(save=True)
 
@@ -0,0 +1,129 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import Maze
+import Tiled
+
+
+# what every worker process attaches to once, set up by _init_worker
+_worker = {}
+
+
+def _init_worker(shm_name: str, length: int, width: int, tile: int, method: str, seed: int):
+    """Attaches a worker to the shared wall array and lays out the same regions as the parent."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+
+    _worker['shm'] = shm
+    _worker['cells'] = np.ndarray((length, width), dtype=np.uint8, buffer=shm.buf)
+    _worker['tiled'] = Tiled.Tiled_Maze(length, width, tile, method, seed)
+
+
+def _carve(regions: list) -> int:
+    """
+    Carves regions straight into the shared wall array, each one closed off from the others
+
+    Args:
+        regions: (row, col) of the regions to carve
+
+    Returns:
+        nodes: number of nodes carved
+    """
+    cells, tiled = _worker['cells'], _worker['tiled']
+    nodes = 0
+
+    for row, col in regions:
+        region = tiled.tile_cells(row, col, doors=False)
+        top, left = row * tiled.tile, col * tiled.tile
+        cells[top:top + region.shape[0], left:left + region.shape[1]] = region
+        nodes += region.size
+
+    return nodes
+
+
+def parallel_generate(length: int, width: int, tile: int = 256, method: str = 'backtrack', seed: int = None,
+                      workers: int = None) -> Maze.Maze:
+    """
+    Generates one maze across several processes that share its wall array
+
+    The maze is split into regions the way Tiled_Maze splits it into tiles. Every worker
+    carves whole regions straight into a multiprocessing.shared_memory wall array, then
+    the parent joins the regions with one door along every edge of a spanning tree over
+    them. The result is the same perfect maze Tiled_Maze writes for the same arguments,
+    however many workers there are.
+
+    Args:
+        length: the number of nodes long
+        width: the number of nodes wide
+        tile: the number of nodes long and wide of every region, a multiple of 4
+        method: generation method passed to Maze.generate for every region
+        seed: optional seed to make the generated maze reproducible
+        workers: number of processes, defaults to the number of cores
+
+    Returns:
+        maze: the generated maze
+    """
+    tiled = Tiled.Tiled_Maze(length, width, tile, method, seed)
+    workers = workers or os.cpu_count()
+
+    # a few more chunks of regions than workers so they all finish at about the same time
+    regions = [(row, col) for row in range(tiled.tile_rows) for col in range(tiled.tile_cols)]
+    chunk = max(1, len(regions) // (workers * 4))
+    chunks = [regions[i:i + chunk] for i in range(0, len(regions), chunk)]
+
+    shm = shared_memory.SharedMemory(create=True, size=max(1, length * width))
+    try:
+        cells = np.ndarray((length, width), dtype=np.uint8, buffer=shm.buf)
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(shm.name, length, width, tile, method, tiled.seed)) as executor:
+            carved = sum(executor.map(_carve, chunks))
+
+        if carved != length * width:
+            raise RuntimeError(f"Only {carved} of {length * width} nodes were carved")
+
+        tiled.knock_doors(cells)
+
+        m = Maze.Maze(length=length, width=width)
+        m.cells[:] = cells
+        del cells
+    finally:
+        shm.close()
+        shm.unlink()
+
+    m.algorithm = 'tiled'
+    m.seed = tiled.seed
+
+    return m
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time generating one maze across 1 to N processes.")
+    parser.add_argument('--length', type=int, default=2048)
+    parser.add_argument('--width', type=int, default=2048)
+    parser.add_argument('--tile', type=int, default=256)
+    parser.add_argument('--method', default='backtrack')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, nargs='+', default=None,
+                        help="worker counts to time, defaults to 1 up to the number of cores")
+    args = parser.parse_args()
+
+    counts = args.workers or list(range(1, os.cpu_count() + 1))
+
+    print(f"{'workers':>7} {'seconds':>9} {'speedup':>8} {'perfect':>8}")
+    baseline = None
+    for workers in counts:
+        start = time.perf_counter()
+        m = parallel_generate(args.length, args.width, args.tile, args.method, args.seed, workers)
+        seconds = time.perf_counter() - start
+
+        baseline = baseline or seconds
+        print(f"{workers:>7} {seconds:>9.2f} {baseline / seconds:>7.2f}x {str(m.is_perfect()):>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+import functools
+import json
+import time
+
+
+class Profiler(object):
+    """Collects stage timings, counters and node expansion callbacks from a Maze or Maze_Solver.
+
+    Nothing is collected unless a profiler is attached, a maze or solver without one only
+    pays for a single None check per timed method call. Attach the same profiler to a maze
+    and its solver to get one report for the whole pipeline:
+
+        profiler = Profiler()
+        m = Maze.Maze(35, 35)
+        m.profiler = profiler
+        m.generate('backtrack')
+
+        sol = Solver.Maze_Solver(m, profiler=profiler)
+        sol.BFS()
+        print(profiler.to_json())
+
+    Stages are named after the methods that are timed, a stage that calls another timed
+    method (generate calling iterative_backtrack) counts the time in both.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+        self.callbacks = []
+
+    def reset(self):
+        """Forgets everything collected so far, the callbacks stay registered."""
+        self.stages = {}
+        self.counters = {}
+
+    def record(self, stage: str, seconds: float):
+        """Adds a call of a stage that took seconds of wall time."""
+        totals = self.stages.setdefault(stage, {'seconds': 0.0, 'calls': 0})
+        totals['seconds'] += seconds
+        totals['calls'] += 1
+
+    def count(self, name: str, value: int = 1):
+        """Adds value to a counter."""
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def peak(self, name: str, value: int):
+        """Keeps the largest value a counter has been set to, for high-water marks."""
+        if value > self.counters.get(name, value - 1):
+            self.counters[name] = value
+
+    def on_expand(self, callback):
+        """
+        Registers a function to call every time a search expands a vertex
+
+        Args:
+            callback: function of (pos, frontier) where pos is the [x, y] board square being
+                      expanded and frontier is how many vertices are waiting to be expanded
+        """
+        self.callbacks.append(callback)
+
+    def expanded(self, pos: list, frontier: int):
+        """Called by the searches for every vertex they expand."""
+        self.peak('frontier_high_water', frontier)
+
+        for callback in self.callbacks:
+            callback(pos, frontier)
+
+    def report(self) -> dict:
+        """
+        Everything collected so far
+
+        Returns:
+            report: {'stages': {stage: {'seconds', 'calls'}}, 'counters': {name: value}}
+        """
+        return {
+            'stages': {stage: dict(totals) for stage, totals in self.stages.items()},
+            'counters': dict(self.counters)
+        }
+
+    def to_json(self, indent: int = None) -> str:
+        """The report as a JSON string."""
+        return json.dumps(self.report(), indent=indent)
+
+
+def timed(stage: str = None, counters=None):
+    """
+    Decorates a method of an object with a profiler attribute so its calls are timed as a stage
+
+    Args:
+        stage: name of the stage, defaults to the name of the method
+        counters: optional function of the object, run after the method, that returns a
+                  dict of counters to add, it's only run when a profiler is attached
+    """
+    def decorator(method):
+        name = stage or method.__name__
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            profiler = self.profiler
+            if profiler is None:
+                return method(self, *args, **kwargs)
+
+            start = time.perf_counter()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                profiler.record(name, time.perf_counter() - start)
+
+                if counters is not None:
+                    for counter, value in counters(self).items():
+                        profiler.count(counter, value)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,260 @@
+import Maze
+import Solver
+import numpy as np
+
+
+class Query_Engine(object):
+    """Answers distance and path queries between any two open squares of a perfect maze.
+
+    A perfect maze is a tree, so the compressed graph of a Maze_Solver is rooted at the
+    start once and a sparse table over its depth first order finds the lowest common
+    ancestor of two vertices with two lookups. After that setup a distance query is a
+    couple of binary searches and array reads, and whole arrays of queries are answered
+    at once.
+
+    Positions are [x, y] squares on the solver's board, a maze node (x, y) is the board
+    square (2x + 1, 2y + 1). Distances are counted in board squares like the rest of the
+    solver.
+
+    Args:
+        solver: a Maze_Solver of a perfect maze
+
+    Raises:
+        ValueError: if the maze has loops or parts that can't be reached from the start
+    """
+
+    def __init__(self, solver: Solver.Maze_Solver):
+        self.solver = solver
+        self.board = solver.board
+
+        solver.build_graph()
+
+        indptr, indices, weights, _ = solver._adjacency()
+        self.positions = solver.positions
+        total = len(indptr) - 1
+
+        # walk the tree from the start, the order the vertices come off the stack is a preorder
+        parents = [-1] * total
+        distance = [0] * total
+        depth = [0] * total
+        order = []
+
+        seen = bytearray(total)
+        seen[solver.start_id] = 1
+        stack = [solver.start_id]
+
+        while stack:
+            current = stack.pop()
+            order.append(current)
+
+            for i in range(indptr[current], indptr[current + 1]):
+                next_id = indices[i]
+
+                if not seen[next_id]:
+                    seen[next_id] = 1
+                    parents[next_id] = current
+                    distance[next_id] = distance[current] + weights[i]
+                    depth[next_id] = depth[current] + 1
+                    stack.append(next_id)
+
+                elif next_id != parents[current]:
+                    raise ValueError("The maze has a loop, distance queries need a perfect maze")
+
+        if len(order) != total:
+            raise ValueError(f"{total - len(order)} vertices can't be reached from the start, "
+                             f"distance queries need a perfect maze")
+
+        self.parents = np.array(parents, dtype=np.intp)
+        self.root_distance = np.array(distance, dtype=np.int64)
+        self.depth = np.array(depth, dtype=np.int64)
+
+        self.order = np.array(order, dtype=np.intp)
+        self.preorder = np.empty(total, dtype=np.intp)
+        self.preorder[self.order] = np.arange(total)
+
+        # table[k][i] is the shallowest vertex among order[i:i + 2**k]
+        self.table = [self.order]
+        while 2 ** len(self.table) <= total:
+            half = 2 ** (len(self.table) - 1)
+            previous = self.table[-1]
+            first, second = previous[:-half], previous[half:]
+            self.table.append(np.where(self.depth[first] <= self.depth[second], first, second))
+
+        # vertices sorted down each column, for finding the ends of vertical corridors
+        rows = self.board.shape[0]
+        self._by_column = np.sort(self.positions[:, 0] * rows + self.positions[:, 1])
+        self._column_ids = np.lexsort((self.positions[:, 1], self.positions[:, 0]))
+
+    def lca(self, first, second):
+        """
+        Finds the lowest common ancestor of two vertices in the tree rooted at the start
+
+        Args:
+            first: vertex id, or an array of them
+            second: vertex id, or an array of them
+
+        Returns:
+            ancestor: vertex id of the lowest common ancestor, or an array of them
+        """
+        first, second = np.asarray(first), np.asarray(second)
+        low = np.minimum(self.preorder[first], self.preorder[second])
+        high = np.maximum(self.preorder[first], self.preorder[second])
+
+        # the parent of the shallowest vertex in (low, high] of the preorder is the ancestor
+        start = np.minimum(low + 1, high)
+        level = np.log2(np.maximum(high - start + 1, 1)).astype(np.intp)
+
+        candidates = np.empty_like(start)
+        for k in np.unique(level):
+            rows = level == k
+            left = self.table[k][start[rows]]
+            right = self.table[k][high[rows] - 2 ** k + 1]
+            candidates[rows] = np.where(self.depth[left] <= self.depth[right], left, right)
+
+        ancestor = np.where(first == second, first, self.parents[candidates])
+        return ancestor if ancestor.ndim else int(ancestor)
+
+    def _vertex_distance(self, first, second):
+        """Tree distance between two vertex ids (or arrays of them) in board squares."""
+        return self.root_distance[first] + self.root_distance[second] - 2 * self.root_distance[self.lca(first, second)]
+
+    def _locate(self, positions: np.ndarray) -> tuple:
+        """
+        Finds the corridor every position lies on
+
+        Args:
+            positions: (n, 2) array of [x, y] board squares
+
+        Returns:
+            ends: (n, 2) vertex ids at the two ends of the corridor, both the same for a vertex
+            offsets: (n, 2) squares from the position to each of the two ends
+        """
+        rows, cols = self.board.shape
+        xs, ys = positions[:, 0], positions[:, 1]
+
+        outside = (xs < 0) | (xs >= cols) | (ys < 0) | (ys >= rows)
+        if outside.any() or not self.board[ys, xs].all():
+            bad = positions[outside | ~self.board[np.clip(ys, 0, rows - 1), np.clip(xs, 0, cols - 1)]][0]
+            raise ValueError(f"Position {bad.tolist()} isn't an open square of the maze")
+
+        # a square that isn't a vertex sits between the previous and next vertex along its row or column
+        flat = ys * cols + xs
+        index = np.searchsorted(self.solver._flat_vertices, flat)
+        found = self.solver._flat_vertices[np.minimum(index, len(self.positions) - 1)] == flat
+
+        ends = np.empty((len(positions), 2), dtype=np.intp)
+        ends[:, 0] = np.where(found, index, index - 1)
+        ends[:, 1] = index
+
+        # corridors that run up and down use the vertices in column order instead
+        vertical = ~found & self.board[np.maximum(ys - 1, 0), xs] & (ys > 0)
+        if vertical.any():
+            column_index = np.searchsorted(self._by_column, xs[vertical] * rows + ys[vertical])
+            ends[vertical, 0] = self._column_ids[column_index - 1]
+            ends[vertical, 1] = self._column_ids[column_index]
+
+        end_positions = self.positions[ends]
+        offsets = np.abs(end_positions[:, :, 0] - xs[:, None]) + np.abs(end_positions[:, :, 1] - ys[:, None])
+
+        return ends, offsets
+
+    def _best_route(self, first: np.ndarray, second: np.ndarray) -> tuple:
+        """
+        Picks which corridor ends the shortest route between two sets of positions leaves and enters by
+
+        Args:
+            first: (n, 2) array of [x, y] board squares
+            second: (n, 2) array of [x, y] board squares
+
+        Returns:
+            length: shortest distance for every pair of positions
+            leave: the corridor end index (0 or 1) used at the first position
+            enter: the corridor end index (0 or 1) used at the second position
+            same: pairs that share a corridor and don't need to go through any vertex
+            first_ends: corridor ends of the first positions
+            second_ends: corridor ends of the second positions
+        """
+        first_ends, first_offsets = self._locate(first)
+        second_ends, second_offsets = self._locate(second)
+
+        # try leaving and entering each corridor by both of its ends
+        routes = np.stack([
+            first_offsets[:, i] + self._vertex_distance(first_ends[:, i], second_ends[:, j]) + second_offsets[:, j]
+            for i in (0, 1) for j in (0, 1)
+        ], axis=1)
+        choice = routes.argmin(axis=1)
+        length = routes[np.arange(len(routes)), choice]
+
+        # two squares on the same corridor are just the squares between them apart
+        same = (np.sort(first_ends, axis=1) == np.sort(second_ends, axis=1)).all(axis=1)
+        direct = np.abs(first[:, 0] - second[:, 0]) + np.abs(first[:, 1] - second[:, 1])
+        length = np.where(same, np.minimum(direct, length), length)
+
+        return length, choice // 2, choice % 2, same & (direct <= length), first_ends, second_ends
+
+    def distance(self, first, second):
+        """
+        Shortest distance between two squares, or between every pair of rows of two arrays
+
+        Args:
+            first: [x, y] board square, or an (n, 2) array of them
+            second: [x, y] board square, or an (n, 2) array of them
+
+        Returns:
+            length: distance in board squares, an array of them for arrays of queries
+        """
+        first, second = np.asarray(first, dtype=np.intp), np.asarray(second, dtype=np.intp)
+        single = first.ndim == 1
+
+        length = self._best_route(first.reshape(-1, 2), second.reshape(-1, 2))[0]
+
+        return int(length[0]) if single else length
+
+    def path(self, first, second) -> list:
+        """
+        Shortest path between two squares
+
+        Args:
+            first: [x, y] board square to start from
+            second: [x, y] board square to end at
+
+        Returns:
+            path: [x, y] positions from first to second through every vertex in between,
+                  consecutive positions are always on one straight corridor
+        """
+        first = np.asarray(first, dtype=np.intp).reshape(1, 2)
+        second = np.asarray(second, dtype=np.intp).reshape(1, 2)
+        _, leave, enter, same, first_ends, second_ends = self._best_route(first, second)
+
+        if same[0]:
+            ids = []
+        else:
+            # climb from both corridor ends up to their common ancestor
+            source, target = int(first_ends[0, leave[0]]), int(second_ends[0, enter[0]])
+            ancestor = self.lca(source, target)
+
+            up, down = [source], [target]
+            while up[-1] != ancestor:
+                up.append(int(self.parents[up[-1]]))
+            while down[-1] != ancestor:
+                down.append(int(self.parents[down[-1]]))
+
+            ids = up + down[-2::-1]
+
+        path = [first[0].tolist()] + self.positions[ids].tolist() + [second[0].tolist()]
+
+        # drop the ends when they are the vertices themselves
+        return [pos for i, pos in enumerate(path) if i == 0 or pos != path[i - 1]]
+
+
+def main():
+    m = Maze.Maze(length=35, width=35)
+    m.generate('backtrack', seed=0)
+
+    engine = Query_Engine(Solver.Maze_Solver(m, mode='graph'))
+    print(engine.distance(engine.solver.start_pos, engine.solver.exit_pos))
+    print(engine.path([1, 1], [69, 69]))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,30 +1,63 @@
 import Maze
+import bisect
+import heapq
+import math
 import numpy as np
-from PIL import Image, ImageDraw
+from collections import deque
+from PIL import GifImagePlugin, Image
+
+from Profiler import timed
+
+
+# estimates of the distance left to the exit from the change in position, for astar
+HEURISTICS = {
+    'manhattan': lambda dx, dy: abs(dx) + abs(dy),
+    'euclidean': lambda dx, dy: math.hypot(dx, dy)
+}
+
+
+# a solver expecting at most this many searches works straight on the maze instead of building the graph
+DIRECT_MAX_QUERIES = 1
+
+SOLVER_MODES = ('auto', 'graph', 'direct')
 
 
 # created a separate node object for solving so that it would be easier to retrace steps after solving
 class Node(object):
-    def __init__(self, pos:list, edges:list):
-        self.pos = pos
+    """A square of the board the solver went through.
+
+    Slotted so large graphs don't carry a dict per vertex. The position is kept as an
+    (x, y) tuple and nodes hash and compare by it, so they can go in sets and be dict
+    keys. A node also equals a list or tuple of the same position and hashes like the
+    tuple, so (x, y) in a set of nodes finds the node.
+
+    Args:
+        pos: [x, y] position on the board
+        edges: [parent, child] position pairs of the edges leaving the node
+    """
+
+    __slots__ = ('pos', 'parent', 'edges')
+
+    def __init__(self, pos, edges=()):
+        self.pos = tuple(pos)
         self.parent = None
         self.edges = edges
 
+    @property
+    def index(self) -> int:
+        """The position packed into one integer, y in the high 32 bits and x in the low."""
+        return self.pos[1] << 32 | self.pos[0]
+
+    def __hash__(self):
+        return hash(self.pos)
+
     def __eq__(self, other):
-        if other == None:
-            return False
-        elif type(other) == list:
-            return self.pos == other
+        if type(other) is Node:
+            return self.pos == other.pos
+        elif type(other) in (list, tuple):
+            return self.pos == tuple(other)
         else:
-            return other.pos == self.pos
-
-    def __neq__(self, other):
-        if other == None:
             return False
-        elif type(other) == list:
-            return self.pos != other
-        else:
-            return other.pos != self.pos
 
     def __getitem__(self, index: int):
         return self.pos[index]
@@ -36,160 +69,469 @@ class Node(object):
         return [self.pos[0] - other.pos[0], self.pos[1] - other.pos[1]]
 
     def __repr__(self):
-        return str(self.pos)
+        return str(list(self.pos))
 
     def __str__(self):
-        return str(self.pos)
+        return str(list(self.pos))
 
 
 class Maze_Solver(object):
-    def __init__(self, maze:Maze.Maze):
-        self.maze = maze
+    """Finds paths from the start to the exit of a maze.
+
+    In graph mode the board is compressed into a graph of its important squares up front,
+    which pays off when the maze is searched many times or the graph itself is wanted. In
+    direct mode BFS, dijkstra and astar walk the maze's wall array node by node and the
+    graph is never built, which is faster for a single solve of a fresh maze. Both modes
+    store the same kind of path, the vertices it goes through. DFS, bidirectional and
+    anything that uses the graph build it the first time they need it.
+
+    The modes only agree when there's a single path to find. On a maze with loops direct
+    BFS finds the path with the fewest squares while graph BFS finds the one with the
+    fewest vertices, and equally short paths can tie differently, so 'auto' only goes
+    direct for a perfect maze.
+
+    An incremental solver subscribes to its maze and keeps its path up to date while walls
+    are toggled with Maze.change_wall. Every edit patches the board squares of the wall and
+    the corridors running through them, then repair fixes the path with Lifelong Planning A*,
+    which only revisits the vertices whose distance from the start the edit changed.
+
+    Args:
+        maze: the maze to solve
+        queries: how many searches are expected, used to pick the mode
+        mode: 'graph', 'direct' or 'auto' to go direct for up to DIRECT_MAX_QUERIES searches
+              of a perfect maze, see Maze.is_perfect
+        profiler: optional Profiler.Profiler to report to, defaults to the maze's
+        incremental: follow the maze's wall changes and repair the path after each one,
+                     always in graph mode, see repair
+    """
+
+    def __init__(self, maze:Maze.Maze, queries:int=1, mode:str='auto', profiler=None, incremental:bool=False):
+        if mode not in SOLVER_MODES:
+            raise ValueError(f"Unknown mode '{mode}', expected one of {list(SOLVER_MODES)}")
 
-        self.vertices = []
-        self.edges = []
+        self.maze = maze
+        if incremental:
+            mode = 'graph'
+        elif mode == 'auto':
+            mode = 'direct' if queries <= DIRECT_MAX_QUERIES and maze.is_perfect() else 'graph'
+        self.mode = mode
+        self.profiler = profiler if profiler is not None else maze.profiler
+
+        self._vertices = None
+        self._edges = None
         self.path = []
 
+        # how many vertices the last search expanded
+        self.expanded = 0
+
         self.width = self.maze.width
         self.length = self.maze.length
 
-        self.start_pos = None
-        self.exit_pos = None
+        # the openings in the outer wall come from the maze rather than its drawing
+        self.start_pos = list(self.maze.start_pos)
+        self.exit_pos = list(self.maze.exit_pos)
 
-        # create a simple numpy array to map out the corridors and walls
+        # a boolean array of the corridors (True) and walls (False)
         self.board = self._get_2d()
 
         # create a node graph where there are only important nodes 
-        self._create_graph()
+        self._flat_vertices = None
+        self._overrides = {}
+        self._stale = False
+        if self.mode == 'graph':
+            self._create_graph()
+
+        # Lifelong Planning A* state of an incremental solver, keyed by flat board index
+        self.incremental = incremental
+        if incremental:
+            self._start_incremental()
+
+    @timed(counters=lambda self: {'squares': (self.length * 2 + 1) * (self.width * 2 + 1)})
+    def _get_2d(self) -> np.ndarray:
+        """
+        Builds the board straight from the maze's wall array.
 
-    def _get_2d(self):
-        text_maze = self.maze.simple_ascii(save=False)
-        zero = np.zeros((len(text_maze[0]), len(text_maze)))
+        Returns:
+            board: (2L+1)x(2W+1) boolean array that is True for open squares
+        """
+        board = ~Maze.wall_canvas(self.maze.cells)
+        board[self.start_pos[1], self.start_pos[0]] = True
+        board[self.exit_pos[1], self.exit_pos[0]] = True
+
+        return board
 
-        for y in range(len(text_maze)):
-            for x in range(len(text_maze[y])):
+    @timed(counters=lambda self: {'vertices': len(self.positions), 'edges': len(self.indices) // 2})
+    def _create_graph(self):
+        """
+        Compresses the board into a graph where only the important squares are vertices.
 
-                if text_maze[y][x] == '.':
-                    zero[y, x] = 1
-                elif text_maze[y][x] == 'S':
-                    self.start_pos = [x, y]
-                    zero[y, x] = 1
-                elif text_maze[y][x] == 'E':
-                    self.exit_pos = [x, y]
-                    zero[y, x] = 1
+        Every open square that isn't a straight run through a corridor (dead ends, corners,
+        junctions, the start and exit) becomes a vertex, so every edge is a straight corridor
+        and its length is how many squares apart the two ends are. Found with whole-board
+        array operations in O(squares), the graph is stored in CSR form:
 
-        return zero
+            positions: [x, y] of every vertex, in row-major order
+            indptr: neighbors of vertex v are indices[indptr[v]:indptr[v + 1]]
+            indices: neighbor vertex ids
+            weights: corridor length of each edge, in board squares
+        """
+        board = self.board
+        rows, cols = board.shape
+
+        # which of the four neighbors of every square are open, outside the board is a wall
+        padded = np.pad(board, 1)
+        up, down = padded[:-2, 1:-1], padded[2:, 1:-1]
+        left, right = padded[1:-1, :-2], padded[1:-1, 2:]
+
+        degree = up.astype(np.int8) + down + left + right
+        straight = (degree == 2) & ((up & down) | (left & right))
+
+        # vertices are sorted by flat index so position lookups can use a binary search
+        self._flat_vertices = np.flatnonzero(board & ~straight)
+        ys, xs = np.divmod(self._flat_vertices, cols)
+        self.positions = np.stack([xs, ys], axis=1)
+
+        # an open square to the right of a vertex leads along the row to the next vertex
+        ids = np.arange(len(self._flat_vertices))
+        east = ids[right.reshape(-1)[self._flat_vertices]]
+        east_to = east + 1
+
+        # same for the square below and the next vertex down the column
+        by_column = np.lexsort((ys, xs))
+        below = np.empty_like(by_column)
+        below[by_column[:-1]] = by_column[1:]
+        south = ids[down.reshape(-1)[self._flat_vertices]]
+        south_to = below[south]
+
+        # store each corridor in both directions
+        sources = np.concatenate([east, east_to, south, south_to])
+        targets = np.concatenate([east_to, east, south_to, south])
+        weights = np.abs(xs[sources] - xs[targets]) + np.abs(ys[sources] - ys[targets])
+
+        order = np.lexsort((targets, sources))
+        self.indices = targets[order]
+        self.weights = weights[order]
+        self.indptr = np.zeros(len(ids) + 1, dtype=np.intp)
+        np.cumsum(np.bincount(sources, minlength=len(ids)), out=self.indptr[1:])
+        self._adjacency_lists = None
+        self._flat_list = None
+        self._base_neighbors = {}
+        self._vertices = None
+        self._edges = None
+
+        # the graph matches the board again, wall changes no longer need patching over it
+        self._overrides = {}
+        self._stale = False
+
+        self.start_id = self.vertex_id(self.start_pos)
+        self.exit_id = self.vertex_id(self.exit_pos)
+
+    def build_graph(self):
+        """Builds the graph if it hasn't been yet, for solvers that started in direct mode, or again after wall changes."""
+        if self._flat_vertices is None or self._stale:
+            self._create_graph()
+
+    def vertex_id(self, pos) -> int:
+        """
+        Gets the id of the vertex at a board position
 
-    def _add_directions(self, current:list, dir:list):
-        dim = self.board.shape
+        Args:
+            pos: [x, y] position on the board
 
-        if current[0] + dir[0] < 0 or current[0] + dir[0] >= dim[1]:
-            return -1
+        Returns:
+            id: index of the vertex, or -1 if the position isn't a vertex
+        """
+        self.build_graph()
+        flat = pos[1] * self.board.shape[1] + pos[0]
+        index = int(np.searchsorted(self._flat_vertices, flat))
 
-        if current[1] + dir[1] < 0 or current[1] + dir[1] >= dim[0]:
-            return -1
+        if index < len(self._flat_vertices) and self._flat_vertices[index] == flat:
+            return index
 
-        return [current[0] + dir[0], current[1] + dir[1]]
+        return -1
 
-    def _look_around(self, position) -> list:
-        if [position[0] - 1, position[1]] in self.vertices:
-            return [position[0] - 1, position[1]]
+    @property
+    def vertices(self) -> list:
+        """Every vertex as a Node, only built when asked for since the searches work on the CSR graph."""
+        if self._vertices is None:
+            self._build_nodes()
 
-        elif [position[0] + 1, position[1]] in self.vertices:
-            return [position[0] + 1, position[1]]
+        return self._vertices
 
-        elif [position[0], position[1] - 1] in self.vertices:
-            return [position[0] , position[1] - 1]
+    @property
+    def edges(self) -> list:
+        """Every edge as a [parent, child] pair of positions, built along with vertices."""
+        if self._edges is None:
+            self._build_nodes()
 
-        elif [position[0], position[1] + 1] in self.vertices:
-            return [position[0], position[1] + 1]
+        return self._edges
 
-    def _create_graph(self):
-        queue = []
-        queue.append(self.start_pos)
+    @timed()
+    def _build_nodes(self):
+        """
+        Creates the Node vertices and [parent, child] edges from the CSR graph.
 
-        visited = []
-        previous = None
+        Edges point away from the start, in the order a breadth first walk from
+        the start finds them.
+        """
+        self.build_graph()
+        positions = self.positions.tolist()
+        start = self.start_id
+
+        seen = bytearray(len(positions))
+        seen[start] = 1
+        queue = deque([start])
+        children = [[] for _ in positions]
+        self._edges = []
+
+        while queue:
+            current = queue.popleft()
+
+            for next_id in self.indices[self.indptr[current]:self.indptr[current + 1]].tolist():
+                if not seen[next_id]:
+                    seen[next_id] = 1
+                    edge = [positions[current], positions[next_id]]
+                    children[current].append(edge)
+                    self._edges.append(edge)
+                    queue.append(next_id)
+
+        self._vertices = [Node(pos, edges) for pos, edges in zip(positions, children)]
+
+    def _adjacency(self, current:bool=True) -> tuple:
+        """
+        Python list copies of the CSR graph, indexing lists is much faster than
+        indexing numpy arrays one element at a time inside the search loops.
 
-        while len(queue) > 0:
-            current = queue.pop(0)
-            visited.append(current)
+        Args:
+            current: rebuild the graph if walls changed since it was built, the incremental
+                     search passes False and reads the changes from _overrides instead
 
-            # always check if there's any local vertices nearby (it can be None)
-            previous = self._look_around(current)
+        Returns:
+            lists: indptr, indices, weights and positions as lists
+        """
+        if current:
+            self.build_graph()
+        elif self._flat_vertices is None:
+            self._create_graph()
 
-            # filter out local dots by if they're not visited and white
-            local_dots = list(map(list, self.neighbors(current[0], current[1])))
-            local_dots = list(filter(lambda i: self.board[i[1], i[0]] == 1 and i not in visited, local_dots))
+        if self._adjacency_lists is None:
+            self._adjacency_lists = (self.indptr.tolist(), self.indices.tolist(),
+                                     self.weights.tolist(), self.positions.tolist())
 
-            if len(local_dots) > 1: # choose first local dot and put rest in queue
-                for x in local_dots[1:]:
-                    if x not in visited and self.board[x[1], x[0]] == 1:
-                        queue.append(list(x))
+        return self._adjacency_lists
 
-            elif len(local_dots) == 0: # dead end
-                if current not in self.vertices: # add dead end to list
-                    self.vertices.append(current)
+    def _set_path(self, parents, goal: int) -> list:
+        """
+        Follows the parents back from the goal and stores the path of vertices from the start.
 
-                # create an edge from the current and previous node if exists
-                if previous is not None and [previous, current] not in self.edges:
-                    self.edges.append([previous, current])
+        Args:
+            parents: parent vertex id of every reached vertex, indexed by vertex id
+            goal: vertex id the path ends at
 
-                continue
+        Returns:
+            path: Node vertices from the start to the goal
+        """
+        ids = [goal]
+        while ids[-1] != self.start_id:
+            ids.append(parents[ids[-1]])
 
-            dir = [local_dots[0][0]-current[0], local_dots[0][1]-current[1]] # get change in direction
+        return self._store_path(ids[::-1])
 
-            # get local dots for new position and do same filtering
-            next_pos = self._add_directions(current, dir)
-            local_dots = list(map(list, self.neighbors(next_pos[0], next_pos[1])))
-            local_dots = list(filter(lambda x: self.board[x[1], x[0]] == 1 and x not in visited, local_dots))
+    def _store_path(self, ids: list) -> list:
+        """
+        Stores a path given as vertex ids as the Node vertices it goes through.
 
-            # continue walk until new discovery
-            while len(local_dots) in [0, 1] and next_pos not in self.vertices and next_pos not in  visited:
-                temp_next = self._add_directions(next_pos, dir)
+        Args:
+            ids: vertex ids from the start to the exit
 
-                if temp_next == -1 or self.board[temp_next[1], temp_next[0]] == 0:
-                    break
+        Returns:
+            path: Node vertices from the start to the exit
+        """
+        positions = self._adjacency()[3]
 
-                visited.append(next_pos)
-                next_pos = self._add_directions(next_pos, dir)
-                local_dots = list(map(list, self.neighbors(next_pos[0], next_pos[1])))
-                local_dots = list(filter(lambda x: self.board[x[1], x[0]] == 1 and x not in visited, local_dots))
+        self.path = [Node(positions[i]) for i in ids]
+        return self.path
 
-            # add new discovery to vertices
-            self.vertices.append(list(next_pos))
+    def _direct_path(self, cells: np.ndarray, parents, goal: int) -> list:
+        """
+        Stores the path found by a direct search as the vertices the graph would have used.
 
-            # ensure that we have a parent node for edge creation
-            if previous == None:
-                previous = current
-                if previous not in self.vertices:
-                    self.vertices.append(previous)
+        The path is every node from the start to the goal, and only the nodes that aren't a
+        straight run through a corridor are kept, which are exactly the graph's vertices.
 
-            # create an edge
-            if current in self.vertices:
-                self.edges.append([current, next_pos])
-            else:
-                self.edges.append([previous, next_pos])
+        Args:
+            cells: the wall bits the search used, from _direct_cells
+            parents: parent node of every reached node, indexed by flat node index
+            goal: flat index of the node the path ends at
 
-            # add new position to queue for continued walk
-            queue.append(next_pos)
+        Returns:
+            path: Node vertices from the start to the exit
+        """
+        ids = [goal]
+        while ids[-1] != 0:
+            ids.append(parents[ids[-1]])
 
-        temp = []
-        for x in self.vertices:
-            edges = [y for y in self.edges if x == y[0]]
-            temp.append(Node(x, edges))
+        ids = np.array(ids[::-1], dtype=np.intp)
+        walls = cells[ids]
 
-        self.vertices = temp
-        for x in self.vertices:
-            if x == Node(self.start_pos, []):
-                self.start_pos = x
-                break
+        # the openings above the first node and below the last one are gaps in the outer wall
+        walls[0] &= Maze.ALL_WALLS ^ Maze.NORTH
+        walls[-1] &= Maze.ALL_WALLS ^ Maze.SOUTH
 
-        for x in self.vertices:
-            if x == Node(self.exit_pos, []):
-                self.exit_pos = x
-                break
+        straight = (walls == Maze.NORTH | Maze.SOUTH) | (walls == Maze.EAST | Maze.WEST)
+        ys, xs = np.divmod(ids[~straight], self.width)
+        squares = np.stack([xs * 2 + 1, ys * 2 + 1], axis=1).tolist()
 
+        self.path = [Node(pos) for pos in [self.start_pos] + squares + [self.exit_pos]]
+        return self.path
+
+    def _direct_moves(self) -> list:
+        """The flat index offsets a node can step by, for each of the 16 ways its walls can be set."""
+        offsets = self.maze._offsets
+
+        return [tuple(offsets[wall] for wall in range(4) if not walls >> wall & 1) for walls in range(16)]
+
+    def _direct_cells(self) -> np.ndarray:
+        """
+        The maze's wall bits the way the board draws them, for the direct searches.
+
+        The board only looks at the south and east walls of every node and always draws the
+        outer wall, so the north and west walls are taken from the neighbors and the outer
+        walls are put up. Without that an outer wall opened with Maze.change_wall would let
+        a search step off the end of the wall array or wrap onto the next row.
+
+        Returns:
+            cells: flat uint8 array of N S E W wall bits, indexed by y * width + x
+        """
+        cells = self.maze.cells
+
+        south = (cells & Maze.SOUTH).astype(bool)
+        east = (cells & Maze.EAST).astype(bool)
+        south[-1] = True
+        east[:, -1] = True
+
+        north = np.ones_like(south)
+        north[1:] = south[:-1]
+        west = np.ones_like(east)
+        west[:, 1:] = east[:, :-1]
+
+        return (north * Maze.NORTH | south * Maze.SOUTH | east * Maze.EAST | west * Maze.WEST).astype(np.uint8).reshape(-1)
+
+    def _direct_BFS(self) -> list:
+        """Breadth first search over the maze's nodes using the wall bits, see BFS."""
+        walls = self._direct_cells()
+        cells = memoryview(walls)
+        moves = self._direct_moves()
+        on_expand = self._expand_hook(direct=True)
+
+        # the start opening is above the first node and the exit below the last
+        goal = len(cells) - 1
+        visited = bytearray(len(cells))
+        parents = [-1] * len(cells)
+
+        queue = deque([0])
+        visited[0] = 1
+        expanded = 0
+
+        while queue:
+            current = queue.popleft()
+            if current == goal:
+                self.expanded = expanded
+                return self._direct_path(walls, parents, goal)
+
+            expanded += 1
+            if on_expand is not None:
+                on_expand(current, len(queue))
+
+            for offset in moves[cells[current]]:
+                next_cell = current + offset
+
+                if not visited[next_cell]:
+                    visited[next_cell] = 1
+                    parents[next_cell] = current
+                    queue.append(next_cell)
+
+        self.expanded = expanded
+        self.path = []
+        return self.path
+
+    def _direct_shortest_path(self, heuristic):
+        """Best first search over the maze's nodes using the wall bits, see _shortest_path."""
+        walls = self._direct_cells()
+        cells = memoryview(walls)
+        moves = self._direct_moves()
+        on_expand = self._expand_hook(direct=True)
+        width = self.width
+        goal = len(cells) - 1
+        goal_x, goal_y = self.exit_pos
+
+        def estimate(node):
+            if heuristic is None:
+                return 0
+
+            y, x = divmod(node, width)
+            return heuristic(x * 2 + 1 - goal_x, y * 2 + 1 - goal_y)
+
+        # costs are in board squares, the first node is one square in from the start
+        distance = {0: 1}
+        parents = {0: -1}
+        heap = [(1 + estimate(0), 1, 0)]
+        expanded = 0
+
+        while heap:
+            _, cost, current = heapq.heappop(heap)
+
+            if cost > distance[current]:
+                continue
+
+            if current == goal:
+                self.expanded = expanded
+                return self._direct_path(walls, parents, goal), cost + 1
+
+            expanded += 1
+            if on_expand is not None:
+                on_expand(current, len(heap))
+            next_cost = cost + 2
+
+            for offset in moves[cells[current]]:
+                next_cell = current + offset
+
+                if next_cost < distance.get(next_cell, math.inf):
+                    distance[next_cell] = next_cost
+                    parents[next_cell] = current
+                    heapq.heappush(heap, (next_cost + estimate(next_cell), next_cost, next_cell))
+
+        self.expanded = expanded
+        self.path = []
+        return self.path, None
+
+    def _expand_hook(self, direct:bool=False):
+        """
+        The function the searches call for every vertex they expand when there's a profiler.
+
+        Args:
+            direct: the search works on flat node indices instead of vertex ids
+
+        Returns:
+            hook: function of (vertex, frontier) that reports to the profiler, None without one
+        """
+        profiler = self.profiler
+        if profiler is None:
+            return None
+
+        if direct:
+            width = self.width
+
+            def hook(node, frontier):
+                y, x = divmod(node, width)
+                profiler.expanded([x * 2 + 1, y * 2 + 1], frontier)
+        else:
+            positions = self._adjacency()[3]
+
+            def hook(vertex, frontier):
+                profiler.expanded(positions[vertex], frontier)
+
+        return hook
 
     def neighbors(self, x:int, y:int):
         """A generator that yields neighboring values.
@@ -221,172 +563,627 @@ class Maze_Solver(object):
     def clear(self):
         """Undoes the solving of the maze."""
 
-        for x in self.vertices:
-            x.parent = None
+        self.path = []
+
+    def _board_rgb(self) -> np.ndarray:
+        """White corridors on black walls as an RGB array, made with a single mask assignment."""
+        arr = np.zeros(self.board.shape + (3,), dtype=np.uint8)
+        arr[self.board] = (255, 255, 255)
+
+        return arr
 
     def _show_pairs(self, pair:list, visited:list=None, next_nodes:list=None):
-        l, w = self.board.shape
+        arr = self._board_rgb()
 
-        img = Image.new('RGB', (w, l), color=(0, 0, 0))
-        arr = np.array(img)
+        # paint every group of positions at once, later groups go on top
+        for positions, color in ((visited, (0, 0, 255)), (next_nodes, (255, 128, 0)), (pair, (0, 255, 255))):
+            if positions:
+                xs, ys = zip(*[(x[0], x[1]) for x in positions])
+                arr[list(ys), list(xs)] = color
 
-        for y in range(l):
-            for x in range(w):
-                if self.board[y, x]:
-                    arr[y, x] = (255, 255, 255)
+        return Image.fromarray(arr, 'RGB')
 
-        if visited:
-            for x in visited:
-                arr[x[1], x[0]] = (0, 0, 255)
+    def _upscale_image(self, img:Image, scale:int=10) -> Image:
+        return Maze.upscale_image(img, scale)
 
-        if next_nodes:
-            for x in next_nodes:
-                arr[x[1], x[0]] = (255, 128, 0)
+    @timed(counters=lambda self: {'expanded': self.expanded})
+    def BFS(self):
+        """
+        Breadth first search from the start to the exit, finds the path with the fewest vertices.
 
-        for x in pair:
-            arr[x[1], x[0]] = (0, 255, 255)
+        In direct mode the search steps between maze nodes, so it finds the path with the
+        fewest squares instead. A perfect maze only has one path so both modes agree.
 
-        return Image.fromarray(arr.astype('uint8'), 'RGB')
+        Returns:
+            path: Node vertices from the start to the exit, empty if the exit can't be reached
+        """
+        if self.mode == 'direct':
+            return self._direct_BFS()
 
-    def _upscale_image(self, img:Image, scale:int=10) -> Image:
-        l, w = self.board.shape
+        indptr, indices, _, _ = self._adjacency()
+        goal = self.exit_id
+        on_expand = self._expand_hook()
 
-        im = Image.new('RGB', (l*scale, w*scale), (0, 0, 0))
-        draw = ImageDraw.Draw(im)
-        arr = np.array(img)
+        visited = bytearray(len(indptr) - 1)
+        parents = [-1] * len(visited)
 
-        for y in range(l):
-            for x in range(w):
-                draw.rectangle([(x * scale, y * scale), ((x + 1) * scale, (y + 1) * scale)], fill=tuple(arr[y,x]))
+        queue = deque([self.start_id])
+        visited[self.start_id] = 1
+        self.expanded = 0
 
-        return im
+        while queue:
+            current = queue.popleft()
+            if current == goal:
+                return self._set_path(parents, goal)
 
-    def BFS(self):
-        queue = [self.start_pos]
+            self.expanded += 1
+            if on_expand is not None:
+                on_expand(current, len(queue))
 
-        visited = []
-        current = None
+            for next_id in indices[indptr[current]:indptr[current + 1]]:
+                if not visited[next_id]:
+                    visited[next_id] = 1
+                    parents[next_id] = current
+                    queue.append(next_id)
 
-        while len(queue) > 0:
-            if current == self.exit_pos:
-                break
+        self.path = []
+        return self.path
 
-            current = queue.pop(0)
-            visited.append(current)
+    @timed(counters=lambda self: {'expanded': self.expanded})
+    def DFS(self):
+        """
+        Depth first search from the start to the exit.
 
-            nearby_nodes = [x[1] for x in current.edges]
-            nearby_nodes = list(filter(lambda x: x in nearby_nodes, self.vertices))
+        Returns:
+            path: Node vertices from the start to the exit, empty if the exit can't be reached
+        """
+        indptr, indices, _, _ = self._adjacency()
+        goal = self.exit_id
+        on_expand = self._expand_hook()
 
+        visited = bytearray(len(indptr) - 1)
+        parents = [-1] * len(visited)
 
-            if len(nearby_nodes) == 1:
-                nearby_nodes[0].parent = current
-                queue.append(nearby_nodes[0])
+        stack = [self.start_id]
+        visited[self.start_id] = 1
+        self.expanded = 0
 
-            elif len(nearby_nodes) > 1:
-                for x in nearby_nodes:
-                    x.parent = current
-                    queue.append(x)
+        while stack:
+            current = stack.pop()
+            if current == goal:
+                return self._set_path(parents, goal)
 
-        path = []
-        while current != self.start_pos:
-            path.append(current)
-            current = current.parent
+            self.expanded += 1
+            if on_expand is not None:
+                on_expand(current, len(stack))
 
-        path.append(current)
-        path = path[::-1]
-        self.path = path
+            for next_id in indices[indptr[current]:indptr[current + 1]]:
+                if not visited[next_id]:
+                    visited[next_id] = 1
+                    parents[next_id] = current
+                    stack.append(next_id)
 
-    def DFS(self):
-        stack = [self.start_pos]
+        self.path = []
+        return self.path
 
-        visited = []
-        current = None
+    @timed(counters=lambda self: {'expanded': self.expanded})
+    def bidirectional(self):
+        """
+        Breadth first search from the start and the exit at the same time until the two meet.
 
-        while len(stack) > 0:
-            if current == self.exit_pos:
-                break
+        The smaller frontier is expanded a whole layer at a time, and once the searches touch
+        the best meeting point in that layer is used, so the path has the fewest vertices just
+        like BFS. self.expanded holds how many vertices both sides expanded.
 
-            current = stack.pop()
-            visited.append(current)
+        Returns:
+            path: Node vertices from the start to the exit, empty if the exit can't be reached
+        """
+        indptr, indices, _, _ = self._adjacency()
+        start, goal = self.start_id, self.exit_id
+        on_expand = self._expand_hook()
+        self.expanded = 0
+
+        if start == goal:
+            return self._store_path([start])
+
+        # which side reached each vertex first (1 for the start, 2 for the exit) and how far away it is
+        side = bytearray(len(indptr) - 1)
+        distance = [0] * len(side)
+        parents = [-1] * len(side)
+        side[start], side[goal] = 1, 2
+
+        frontiers = {1: [start], 2: [goal]}
+        best = None
+
+        while frontiers[1] and frontiers[2] and best is None:
+            current_side = 1 if len(frontiers[1]) <= len(frontiers[2]) else 2
+            layer = []
+
+            for current in frontiers[current_side]:
+                self.expanded += 1
+                if on_expand is not None:
+                    on_expand(current, len(frontiers[1]) + len(frontiers[2]) + len(layer))
+
+                for next_id in indices[indptr[current]:indptr[current + 1]]:
+                    if not side[next_id]:
+                        side[next_id] = current_side
+                        distance[next_id] = distance[current] + 1
+                        parents[next_id] = current
+                        layer.append(next_id)
+
+                    elif side[next_id] != current_side:
+                        # the searches touched, remember the shortest connection
+                        length = distance[current] + distance[next_id] + 1
+                        if best is None or length < best[0]:
+                            best = (length, current, next_id) if current_side == 1 else (length, next_id, current)
+
+            frontiers[current_side] = layer
+
+        if best is None:
+            self.path = []
+            return self.path
+
+        # walk back to the start from one side of the meeting point and on to the exit from the other
+        _, forward, backward = best
+
+        ids = [forward]
+        while ids[-1] != start:
+            ids.append(parents[ids[-1]])
+        ids.reverse()
+
+        ids.append(backward)
+        while ids[-1] != goal:
+            ids.append(parents[ids[-1]])
+
+        return self._store_path(ids)
+
+    @timed(counters=lambda self: {'expanded': self.expanded})
+    def dijkstra(self):
+        """
+        Shortest path from the start to the exit, weighing every edge by its corridor length.
+
+        Returns:
+            path: Node vertices from the start to the exit, empty if the exit can't be reached
+            length: number of board squares walked along the path, None if there isn't one
+        """
+        return self._shortest_path(None)
+
+    @timed(counters=lambda self: {'expanded': self.expanded})
+    def astar(self, heuristic:str='manhattan'):
+        """
+        A* search from the start to the exit, weighing every edge by its corridor length.
+
+        Args:
+            heuristic: estimate of the distance left, 'manhattan' or 'euclidean'. Both never
+                       overestimate since corridors only run straight up, down, left or right
+
+        Returns:
+            path: Node vertices from the start to the exit, empty if the exit can't be reached
+            length: number of board squares walked along the path, None if there isn't one
+        """
+        if heuristic not in HEURISTICS:
+            raise ValueError(f"Unknown heuristic '{heuristic}', expected one of {list(HEURISTICS)}")
 
-            nearby_nodes = [x[1] for x in current.edges]
-            nearby_nodes = list(filter(lambda x: x in nearby_nodes, self.vertices))
+        return self._shortest_path(HEURISTICS[heuristic])
 
+    def _shortest_path(self, heuristic):
+        """
+        Best first search over the weighted graph, Dijkstra without a heuristic and A* with one.
 
-            if len(nearby_nodes) == 1:
-                nearby_nodes[0].parent = current
-                stack.append(nearby_nodes[0])
+        Args:
+            heuristic: function of (dx, dy) to the exit, or None
 
-            elif len(nearby_nodes) > 1:
-                for x in nearby_nodes:
-                    x.parent = current
-                    stack.append(x)
+        Returns:
+            path: Node vertices from the start to the exit, empty if the exit can't be reached
+            length: number of board squares walked along the path, None if there isn't one
+        """
+        if self.mode == 'direct':
+            return self._direct_shortest_path(heuristic)
 
-        path = []
-        while current != self.start_pos:
-            path.append(current)
-            current = current.parent
+        indptr, indices, weights, positions = self._adjacency()
+        start, goal = self.start_id, self.exit_id
+        on_expand = self._expand_hook()
+        goal_x, goal_y = positions[goal]
 
-        path.append(current)
-        path = path[::-1]
-        self.path = path
+        def estimate(vertex):
+            if heuristic is None:
+                return 0
 
-    def walk_animation(self, speed:float=0.75): # not done
-        images = []
-        visited = []
-        for x in self.path:
-            visited.append(x)
-            images.append(self._show_pairs([x], visited=visited))
+            x, y = positions[vertex]
+            return heuristic(x - goal_x, y - goal_y)
 
-        duration = int(len(images) * speed)
-        print(duration)
+        # only reached vertices get an entry so a search that ends early stays cheap
+        distance = {start: 0}
+        parents = {start: -1}
+        heap = [(estimate(start), 0, start)]
+        self.expanded = 0
 
-        images = [self._upscale_image(x, 4) for x in images]
+        while heap:
+            _, cost, current = heapq.heappop(heap)
 
-        images[0].save('walk.gif',
-                       save_all=True, append_images=images[1:], optimize=False, duration=duration, loop=0)
+            # skip entries that were pushed before a shorter way to the vertex was found
+            if cost > distance[current]:
+                continue
 
-    def show_path(self, upscale:bool=True):
-        l, w = self.board.shape
+            if current == goal:
+                return self._set_path(parents, goal), cost
+
+            self.expanded += 1
+            if on_expand is not None:
+                on_expand(current, len(heap))
+            for i in range(indptr[current], indptr[current + 1]):
+                next_id = indices[i]
+                next_cost = cost + weights[i]
+
+                if next_cost < distance.get(next_id, math.inf):
+                    distance[next_id] = next_cost
+                    parents[next_id] = current
+                    heapq.heappush(heap, (next_cost + estimate(next_id), next_cost, next_id))
+
+        self.path = []
+        return self.path, None
+
+    def _open_square(self, x:int, y:int) -> bool:
+        """Whether a board square is open, outside the board is a wall."""
+        rows, cols = self.board.shape
+        return 0 <= x < cols and 0 <= y < rows and bool(self.board[y, x])
+
+    def _is_vertex(self, x:int, y:int) -> bool:
+        """Whether a board square is a vertex of the graph, an open square that isn't a straight run, see _create_graph."""
+        if not self._open_square(x, y):
+            return False
+
+        up, down = self._open_square(x, y - 1), self._open_square(x, y + 1)
+        left, right = self._open_square(x - 1, y), self._open_square(x + 1, y)
+
+        return not (up + down + left + right == 2 and ((up and down) or (left and right)))
+
+    def _corridors(self, x:int, y:int) -> list:
+        """
+        Follows every corridor leaving a board square to the vertex at its other end
+
+        Args:
+            x: x position on the board
+            y: y position on the board
+
+        Returns:
+            ends: (flat board index, corridor length) of the vertex at the end of every corridor
+        """
+        cols = self.board.shape[1]
+        ends = []
+
+        for dx, dy in Maze.DIRECTIONS:
+            next_x, next_y, steps = x + dx, y + dy, 1
+            if not self._open_square(next_x, next_y):
+                continue
+
+            # every square that isn't a vertex is a straight run, so keep going the same way
+            while not self._is_vertex(next_x, next_y):
+                next_x, next_y, steps = next_x + dx, next_y + dy, steps + 1
+
+            ends.append((next_y * cols + next_x, steps))
+
+        return ends
+
+    def _touching(self, squares:list) -> set:
+        """Flat board indices of the vertices among the squares and at the ends of the corridors through them."""
+        cols = self.board.shape[1]
+        found = set()
+
+        for x, y in squares:
+            if not self._open_square(x, y):
+                continue
+
+            if self._is_vertex(x, y):
+                found.add(y * cols + x)
+            found.update(flat for flat, _ in self._corridors(x, y))
+
+        return found
+
+    def _neighbors_at(self, flat:int) -> list:
+        """
+        Neighbors of a vertex in the graph as it is after every wall change so far
+
+        Args:
+            flat: flat board index of the vertex
+
+        Returns:
+            neighbors: (flat board index, corridor length) of every neighbor
+        """
+        if flat in self._overrides:
+            return self._overrides[flat] or []
 
-        img = Image.new('RGB', (w, l), color=(0, 0, 0))
-        arr = np.array(img)
+        # repair asks for the same vertices over and over, so remember what the CSR graph said
+        neighbors = self._base_neighbors.get(flat)
+        if neighbors is not None:
+            return neighbors
 
-        for y in range(l):
-            for x in range(w):
-                if self.board[y, x]:
-                    arr[y, x] = (255, 255, 255)
+        indptr, indices, weights, _ = self._adjacency(current=False)
+        if self._flat_list is None:
+            self._flat_list = self._flat_vertices.tolist()
 
-        current = self.exit_pos
-        while current != self.start_pos:
-            diff = current - current.parent
-            index = 0 if diff[0] != 0 else 1
+        vertex = bisect.bisect_left(self._flat_list, flat)
+        if vertex == len(self._flat_list) or self._flat_list[vertex] != flat:
+            return []
 
-            if index == 0 and diff[index] > 0:
-                for x in range(diff[index]):
-                    arr[current[1], x+current.parent[0]] = (0, 255, 0)
+        neighbors = [(self._flat_list[indices[i]], weights[i]) for i in range(indptr[vertex], indptr[vertex + 1])]
+        self._base_neighbors[flat] = neighbors
+        return neighbors
 
-            elif index == 0 and diff[index] < 0:
-                for x in range(abs(diff[index])):
-                    arr[current[1], -x+current.parent[0]] = (0, 255, 0)
+    def _wall_changed(self, x:int, y:int, wall:int):
+        """
+        Patches the board and graph after Maze.change_wall toggled a wall, then repairs the path
+
+        Only the wall's square and the corners at both ends of it can change on the board, so
+        only the vertices among them and their neighbors, and at the far ends of the corridors
+        through those, before and after the change, get their neighbors found again. The rest
+        of the graph is left alone and the patched vertices are kept in _overrides until the
+        graph is rebuilt.
+
+        Args:
+            x: x position of the node
+            y: y position of the node
+            wall: wall index that was toggled (N S E W)
+        """
+        dx, dy = Maze.DIRECTIONS[wall]
+        wall_x, wall_y = x * 2 + 1 + dx, y * 2 + 1 + dy
+        redrawn = [(wall_x, wall_y), (wall_x + dy, wall_y + dx), (wall_x - dy, wall_y - dx)]
+
+        # draw the nodes around the wall again, the window reaches a node past it so the squares are drawn in full
+        top, left = max(y - 1, 0), max(x - 1, 0)
+        canvas = ~Maze.wall_canvas(self.maze.cells[top:y + 2, left:x + 2])
+
+        # the openings in the outer wall are always open on the board
+        squares = [(sx, sy) for sx, sy in redrawn
+                   if [sx, sy] not in (self.start_pos, self.exit_pos)
+                   and self.board[sy, sx] != canvas[sy - top * 2, sx - left * 2]]
+        if not squares:
+            return
+
+        # a square's neighbors are what make it a vertex or not
+        around = set(squares)
+        for sx, sy in squares:
+            around.update((sx + step_x, sy + step_y) for step_x, step_y in Maze.DIRECTIONS)
+
+        changed = self._touching(around)
+        for sx, sy in squares:
+            self.board[sy, sx] = canvas[sy - top * 2, sx - left * 2]
+        changed |= self._touching(around)
+
+        # searches other than repair rebuild the graph from the board the next time they need it
+        self._stale = True
+        self._vertices = None
+        self._edges = None
+
+        cols = self.board.shape[1]
+        for flat in changed:
+            vertex_y, vertex_x = divmod(flat, cols)
+            self._overrides[flat] = self._corridors(vertex_x, vertex_y) if self._is_vertex(vertex_x, vertex_y) else None
+
+        if self.incremental:
+            for flat in changed:
+                self._lpa_update(flat)
+
+            self.repair()
+
+    def _start_incremental(self):
+        """Subscribes to the maze and finds the first path, every later repair reuses what this search found."""
+        cols = self.board.shape[1]
+        self._lpa_start = self.start_pos[1] * cols + self.start_pos[0]
+        self._lpa_goal = self.exit_pos[1] * cols + self.exit_pos[0]
+
+        # g is the settled distance from the start, rhs the best one offered by the neighbors
+        self._g = {}
+        self._rhs = {self._lpa_start: 0}
+        self._queued = {}
+        self._queue = []
+        self._lpa_push(self._lpa_start)
+
+        self.maze.subscribe(self._wall_changed)
+        self.repair()
+
+    def close(self):
+        """Stops following the maze's wall changes, the path is left as it was after the last repair."""
+        if self.incremental:
+            self.maze.unsubscribe(self._wall_changed)
+            self.incremental = False
+
+    def _lpa_key(self, flat:int) -> tuple:
+        """Priority of a vertex, the smaller of g and rhs plus the manhattan distance to the exit, ties broken by g."""
+        best = min(self._g.get(flat, math.inf), self._rhs.get(flat, math.inf))
+        y, x = divmod(flat, self.board.shape[1])
+
+        return (best + abs(x - self.exit_pos[0]) + abs(y - self.exit_pos[1]), best)
+
+    def _lpa_push(self, flat:int):
+        """Queues a vertex with its current key, older entries for it are skipped when popped."""
+        key = self._lpa_key(flat)
+        self._queued[flat] = key
+        heapq.heappush(self._queue, (key, flat))
+
+    def _lpa_update(self, flat:int):
+        """Finds the rhs of a vertex again from its neighbors and queues it if it no longer matches g."""
+        if flat != self._lpa_start:
+            rhs = min((self._g.get(n, math.inf) + weight for n, weight in self._neighbors_at(flat)), default=math.inf)
+            if rhs == math.inf:
+                self._rhs.pop(flat, None)
+            else:
+                self._rhs[flat] = rhs
+
+        if self._g.get(flat, math.inf) != self._rhs.get(flat, math.inf):
+            self._lpa_push(flat)
+        else:
+            self._queued.pop(flat, None)
+
+    @timed(counters=lambda self: {'expanded': self.expanded})
+    def repair(self):
+        """
+        Brings the path up to date with Lifelong Planning A* after wall changes
+
+        Vertices whose distance from the start an edit changed are queued by _wall_changed
+        and expanded until the exit's distance is settled, the first call is a plain A*
+        search. The work done is proportional to how much of the maze the edits affected.
+        Only an incremental solver that hasn't been closed can repair its path.
+
+        Returns:
+            path: Node vertices from the start to the exit, empty if the exit can't be reached
+            length: number of board squares walked along the path, None if there isn't one
+        """
+        if not self.incremental:
+            raise ValueError("Only an incremental solver that's still following its maze can repair its path, "
+                             "create it with incremental=True")
+
+        goal = self._lpa_goal
+        g, rhs, queue, queued = self._g, self._rhs, self._queue, self._queued
+        on_expand = self.profiler.expanded if self.profiler is not None else None
+        cols = self.board.shape[1]
+        self.expanded = 0
+
+        while queue:
+            key, flat = queue[0]
+
+            # skip entries that were pushed before the vertex was queued again or settled
+            if queued.get(flat) != key:
+                heapq.heappop(queue)
+                continue
+
+            if key >= self._lpa_key(goal) and g.get(goal, math.inf) == rhs.get(goal, math.inf):
+                break
 
-            elif index == 1 and diff[index] < 0:
-                for y in range(abs(diff[index])):
-                    arr[-y+current.parent[1], current[0]] = (0, 255, 0)
+            heapq.heappop(queue)
+            del queued[flat]
 
+            self.expanded += 1
+            if on_expand is not None:
+                y, x = divmod(flat, cols)
+                on_expand([x, y], len(queued))
+
+            if g.get(flat, math.inf) > rhs.get(flat, math.inf):
+                g[flat] = rhs[flat]
             else:
-                for y in range(diff[index]):
-                    arr[y+current.parent[1], current[0]] = (0, 255, 0)
+                # the vertex got further from the start, every neighbor that went through it has to look again
+                g.pop(flat, None)
+                self._lpa_update(flat)
+
+            for n, _ in self._neighbors_at(flat):
+                self._lpa_update(n)
+
+        length = g.get(goal)
+        if length is None:
+            self.path = []
+            return self.path, None
+
+        # walk back from the exit along neighbors whose distance plus the corridor adds up
+        flats = [goal]
+        while flats[-1] != self._lpa_start:
+            flats.append(min(self._neighbors_at(flats[-1]), key=lambda edge: g.get(edge[0], math.inf) + edge[1])[0])
+
+        self.path = [Node(divmod(flat, cols)[::-1]) for flat in reversed(flats)]
+        return self.path, length
+
+    @timed()
+    def walk_animation(self, speed:float=0.75, name:str='walk.gif', scale:int=4, max_frames:int=None):
+        """
+        Saves a GIF of the solved path being walked one vertex at a time.
+
+        A single palette canvas is kept and only the squares that change are painted, then
+        each frame is encoded and written straight away as just the upscaled box around the
+        changes, so memory doesn't grow with the length of the path.
+
+        Args:
+            speed: multiplied by the number of frames to get the time each frame is shown in ms
+            name: name of the output file
+            scale: how many pixels wide and tall each board square is drawn
+            max_frames: optional frame budget, consecutive steps are merged into one frame to stay under it
+        """
+        if not self.path:
+            raise ValueError("There is no path to animate, solve the maze first")
+
+        # walls, corridors, visited vertices and the current vertex
+        palette = [0, 0, 0, 255, 255, 255, 0, 0, 255, 0, 255, 255]
+        canvas = self.board.astype(np.uint8)
+
+        steps = len(self.path)
+        per_frame = 1 if not max_frames or steps <= max_frames else -(-steps // max_frames)
+        frames = -(-steps // per_frame)
+        duration = int(frames * speed)
+
+        def encode(y0, x0, y1, x1):
+            region = canvas[y0:y1, x0:x1].repeat(scale, axis=0).repeat(scale, axis=1)
+            img = Image.fromarray(region, 'P')
+            img.putpalette(palette)
+            return img
+
+        with open(name, 'wb') as fh:
+            for x in self.path[:per_frame]:
+                canvas[x[1], x[0]] = 2
+
+            previous = self.path[per_frame - 1]
+            canvas[previous[1], previous[0]] = 3
+
+            first = encode(0, 0, *canvas.shape)
+            header, _ = GifImagePlugin.getheader(first, info={'loop': 0, 'optimize': False})
+            fh.write(b''.join(header))
+            fh.write(b''.join(GifImagePlugin.getdata(first, duration=duration)))
+
+            for start in range(per_frame, steps, per_frame):
+                # the last current vertex is now just visited, the end of this step is the new current
+                changed = [previous] + self.path[start:start + per_frame]
+                for x in changed:
+                    canvas[x[1], x[0]] = 2
+
+                previous = changed[-1]
+                canvas[previous[1], previous[0]] = 3
+
+                xs, ys = [x[0] for x in changed], [x[1] for x in changed]
+                box = (min(ys), min(xs), max(ys) + 1, max(xs) + 1)
+
+                frame = encode(*box)
+                fh.write(b''.join(GifImagePlugin.getdata(frame, offset=(box[1] * scale, box[0] * scale),
+                                                         duration=duration)))
+
+            fh.write(b';')
 
-            arr[current[1], current[0]] = (0, 255, 0)
-            current = current.parent
+    def path_squares(self) -> np.ndarray:
+        """
+        Every board square the solved path goes through, in order.
+
+        Each step of the path is a straight corridor, so the squares are filled in between
+        the vertices with array operations rather than walking them one at a time.
+
+        Returns:
+            squares: (n, 2) array of [x, y] positions from the start to the exit
+        """
+        points = np.array([x.pos for x in self.path], dtype=np.intp).reshape(-1, 2)
+        steps = np.diff(points, axis=0)
+        lengths = np.abs(steps).sum(axis=1)
+
+        # how far along its step every square is, starting at 1 for the square after the vertex
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths) + 1
+        squares = np.repeat(points[:-1], lengths, axis=0) + np.repeat(np.sign(steps), lengths, axis=0) * offsets[:, None]
+
+        return np.concatenate([points[:1], squares])
+
+    @timed()
+    def show_path(self, upscale:bool=True, name:str='nodes.png'):
+        """
+        Saves an image of the board with the solved path drawn in green.
+
+        Every square the path goes through is painted with a single index assignment.
+
+        Args:
+            upscale: draw every square 8 pixels wide, the upscaled image is written in strips
+            name: name of the output file
+        """
+        arr = self._board_rgb()
 
-        arr[current[1], current[0]] = (0, 255, 0)
+        squares = self.path_squares()
+        arr[squares[:, 1], squares[:, 0]] = (0, 255, 0)
 
         if upscale:
-            self._upscale_image(Image.fromarray(arr.astype('uint8'), 'RGB'), 8).save('nodes.png')
+            Maze.upscale_image(Image.fromarray(arr, 'RGB'), 8, name=name, rows=1024)
         else:
-            Image.fromarray(arr.astype('uint8'), 'RGB').save('nodes.png')
+            Image.fromarray(arr, 'RGB').save(name)
 
 
 def main():
@@ -0,0 +1,249 @@
+import argparse
+import random
+import time
+
+import numpy as np
+
+import Maze
+
+
+class Tiled_Maze(object):
+    """Generates a maze too big to hold in memory one tile at a time, straight into a binary maze file.
+
+    The maze is cut into tiles of tile x tile nodes and every tile is generated on its own
+    as a perfect maze. A second, much smaller maze over the tiles picks which neighboring
+    tiles are joined, and every joined pair gets a single door at a random spot along the
+    edge they share. A spanning tree of perfect tiles joined by one door per tree edge is
+    again a perfect maze, so every node can reach every other by exactly one path.
+
+    Each tile only depends on the seed and its own position, so tiles are generated in any
+    order and can be generated again later without touching the file. Only one tile and
+    the door layout are ever in memory.
+
+    Args:
+        length: the number of nodes long
+        width: the number of nodes wide
+        tile: the number of nodes long and wide of every tile, a multiple of 4 so tiles
+              line up with the bytes of the binary format
+        method: generation method passed to Maze.generate for the tiles and the tree over them
+        seed: optional seed to make the generated maze reproducible
+    """
+
+    def __init__(self, length: int, width: int, tile: int = 256, method: str = 'backtrack', seed: int = None):
+        if tile <= 0 or tile % 4:
+            raise ValueError(f"Tile size {tile} has to be a positive multiple of 4")
+
+        self.length = length
+        self.width = width
+        self.tile = tile
+        self.method = method
+        self.seed = seed if seed is not None else random.getrandbits(63)
+
+        # the binary maze file, set by generate
+        self.name = None
+
+        # the number of tiles down and across, the last ones can be cut short by the edge of the maze
+        self.tile_rows = -(-length // tile)
+        self.tile_cols = -(-width // tile)
+
+        # which tiles are joined, an open wall between two tiles of this maze is a door between them
+        self.blocks = Maze.Maze(length=self.tile_rows, width=self.tile_cols)
+        self.blocks.generate(method, seed=self._seed(-1, -1))
+
+        # where along the shared edge each door is, as an offset from the tile's top or left
+        rng = np.random.default_rng(self._seed(-2, -2))
+        heights = np.array([self.tile_shape(r, 0)[0] for r in range(self.tile_rows)])
+        widths = np.array([self.tile_shape(0, c)[1] for c in range(self.tile_cols)])
+        self.east_doors = (rng.random((self.tile_rows, self.tile_cols)) * heights[:, None]).astype(np.intp)
+        self.south_doors = (rng.random((self.tile_rows, self.tile_cols)) * widths[None, :]).astype(np.intp)
+
+    def _seed(self, row: int, col: int) -> int:
+        """Seed for one tile, or for the tree and doors with negative positions, derived from the maze seed."""
+        sequence = np.random.SeedSequence(self.seed, spawn_key=(row + 2, col + 2))
+        return int(sequence.generate_state(1, dtype=np.uint64)[0])
+
+    def tile_shape(self, row: int, col: int) -> tuple:
+        """The number of nodes long and wide of a tile."""
+        return (min(self.tile, self.length - row * self.tile), min(self.tile, self.width - col * self.tile))
+
+    def tile_cells(self, row: int, col: int, doors: bool = True) -> np.ndarray:
+        """
+        Generates a single tile with its doors to the neighboring tiles knocked down
+
+        Args:
+            row: row of the tile
+            col: column of the tile
+            doors: knock down the doors, without them the tile is closed off, see knock_doors
+
+        Returns:
+            cells: uint8 array of N S E W wall bits for the nodes of the tile
+        """
+        length, width = self.tile_shape(row, col)
+
+        m = Maze.Maze(length=length, width=width)
+        m.generate(self.method, seed=self._seed(row, col))
+        cells = m.cells
+
+        if not doors:
+            return cells
+
+        block = int(self.blocks.cells[row, col])
+
+        if not block & Maze.NORTH:
+            cells[0, self.south_doors[row - 1, col]] &= Maze.ALL_WALLS ^ Maze.NORTH
+        if not block & Maze.SOUTH:
+            cells[-1, self.south_doors[row, col]] &= Maze.ALL_WALLS ^ Maze.SOUTH
+        if not block & Maze.EAST:
+            cells[self.east_doors[row, col], -1] &= Maze.ALL_WALLS ^ Maze.EAST
+        if not block & Maze.WEST:
+            cells[self.east_doors[row, col - 1], 0] &= Maze.ALL_WALLS ^ Maze.WEST
+
+        return cells
+
+    def knock_doors(self, cells: np.ndarray):
+        """
+        Knocks down every door between the tiles of a whole maze at once
+
+        Args:
+            cells: uint8 array of N S E W wall bits for the whole maze, with every tile
+                   generated without its doors
+        """
+        # every tile but the last in a row or column is a full tile wide and long
+        rows, cols = np.nonzero((self.blocks.cells & Maze.EAST) == 0)
+        ys, xs = rows * self.tile + self.east_doors[rows, cols], (cols + 1) * self.tile - 1
+        cells[ys, xs] &= Maze.ALL_WALLS ^ Maze.EAST
+        cells[ys, xs + 1] &= Maze.ALL_WALLS ^ Maze.WEST
+
+        rows, cols = np.nonzero((self.blocks.cells & Maze.SOUTH) == 0)
+        ys, xs = (rows + 1) * self.tile - 1, cols * self.tile + self.south_doors[rows, cols]
+        cells[ys, xs] &= Maze.ALL_WALLS ^ Maze.SOUTH
+        cells[ys + 1, xs] &= Maze.ALL_WALLS ^ Maze.NORTH
+
+    def generate(self, name: str = 'maze.bin'):
+        """
+        Generates every tile and streams it into a binary maze file, see Maze.save_binary
+
+        The packed walls are memory mapped and each tile is written into its block of
+        rows and columns, the file is flushed after every row of tiles.
+
+        Args:
+            name: name of the output file
+        """
+        flags, seed = Maze.pack_seed(self.seed)
+        header = Maze.BINARY_HEADER.pack(Maze.BINARY_MAGIC, Maze.BINARY_VERSION, flags, self.length, self.width,
+                                         seed, b'tiled')
+        row_bytes = (self.width + 3) // 4
+
+        with open(name, 'wb') as fh:
+            fh.write(header)
+            fh.truncate(len(header) + self.length * row_bytes)
+
+        packed = np.memmap(name, dtype=np.uint8, mode='r+', offset=len(header), shape=(self.length, row_bytes))
+
+        for row in range(self.tile_rows):
+            top = row * self.tile
+
+            for col in range(self.tile_cols):
+                tile = Maze.pack_walls(self.tile_cells(row, col))
+                left = col * self.tile // 4
+                packed[top:top + tile.shape[0], left:left + tile.shape[1]] = tile
+
+            packed.flush()
+
+        del packed
+        self.name = name
+
+    def convert_to_image(self, name: str = 'maze.png', rows: int = 64):
+        """Writes the generated maze as a 1:1 image a band of rows at a time, see write_png."""
+        if self.name is None:
+            raise ValueError("The maze hasn't been generated yet")
+
+        write_png(self.name, name, rows)
+
+    def simple_ascii(self, name: str = 'maze.txt', rows: int = 64):
+        """Writes the generated maze as text a band of rows at a time, see write_ascii."""
+        if self.name is None:
+            raise ValueError("The maze hasn't been generated yet")
+
+        write_ascii(self.name, name, rows)
+
+
+def board_bands(name: str, rows: int = 64):
+    """
+    A generator that yields the wall canvas of a binary maze file a band of rows at a time
+
+    Every band is drawn with wall_canvas from its rows of nodes plus the row above it, since
+    the wall between two rows comes from the south walls of the upper one. Stacking the
+    bands gives exactly the canvas of the whole maze.
+
+    Args:
+        name: name of the binary maze file
+        rows: number of rows of nodes in every band
+
+    Returns:
+        top: first row of nodes in the band
+        canvas: boolean rows of the canvas the band adds, True wherever a wall is drawn
+    """
+    packed, length, width, _, _, _ = Maze.open_binary(name)
+
+    for top in range(0, length, rows):
+        bottom = min(top + rows, length)
+        first = max(top - 1, 0)
+
+        above = packed[first - 1:first] if first > 0 else None
+        canvas = Maze.wall_canvas(Maze.unpack_walls(packed[first:bottom], width, above))
+
+        # skip the rows the previous band already drew, the outer wall comes with the last band
+        yield top, canvas[0 if top == 0 else 2:None if bottom == length else -1]
+
+
+def write_png(source: str, name: str = 'maze.png', rows: int = 64):
+    """
+    Writes a binary maze file as the same 1:1 image Maze.convert_to_image makes, a band at a time
+
+    Args:
+        source: name of the binary maze file
+        name: name of the output image
+        rows: number of rows of nodes drawn at a time
+    """
+    _, length, width, _, _, _ = Maze.open_binary(source)
+    Maze.write_canvas_png((canvas for _, canvas in board_bands(source, rows)), length, width, name)
+
+
+def write_ascii(source: str, name: str = 'maze.txt', rows: int = 64):
+    """
+    Writes a binary maze file as the same text Maze.simple_ascii saves, a band at a time
+
+    Args:
+        source: name of the binary maze file
+        name: name of the output text file
+        rows: number of rows of nodes written at a time
+    """
+    Maze.write_canvas_ascii((canvas for _, canvas in board_bands(source, rows)), name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a maze tile by tile straight into a binary maze file.")
+    parser.add_argument('--length', type=int, default=4096)
+    parser.add_argument('--width', type=int, default=4096)
+    parser.add_argument('--tile', type=int, default=256)
+    parser.add_argument('--method', default='backtrack')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--output', default='maze.bin')
+    parser.add_argument('--png', default=None, help="also write the maze as a 1:1 image")
+    parser.add_argument('--ascii', default=None, help="also write the maze as text")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    tiled = Tiled_Maze(args.length, args.width, args.tile, args.method, args.seed)
+    tiled.generate(args.output)
+    print(f"Generated {args.length}x{args.width} in {time.perf_counter() - start:.2f}s")
+
+    if args.png:
+        tiled.convert_to_image(args.png)
+    if args.ascii:
+        tiled.simple_ascii(args.ascii)
+
+
+if __name__ == '__main__':
+    main()